@@ -0,0 +1,93 @@
+"""
+Benchmarks for DataModel diff, propagation and fan-out.
+"""
+import pytest
+
+from livebokeh.datamodel import DataModel
+
+from .conftest import attach, changed, flush, frame
+
+ROWS = [1_000, 10_000, 100_000]
+COLS = [2, 16]
+RATIOS = [0.0, 0.01, 0.5]
+DOCUMENTS = [0, 1, 8]
+
+
+@pytest.mark.parametrize("rows", ROWS)
+@pytest.mark.parametrize("cols", COLS)
+@pytest.mark.parametrize("ratio", RATIOS)
+def test_call(benchmark, rows, cols, ratio):
+    df = frame(rows, cols)
+    new = changed(df, ratio, appended=1)
+
+    def setup():
+        return (DataModel(data=df, name="bench", debug=False),), {}
+
+    benchmark.pedantic(lambda dm: dm(new), setup=setup, rounds=10)
+
+
+@pytest.mark.parametrize("rows", ROWS)
+@pytest.mark.parametrize("ratio", RATIOS)
+def test_patch(benchmark, rows, ratio):
+    df = frame(rows, 2)
+    dm = DataModel(data=df, name="bench", debug=False)
+    new = changed(df, ratio)
+
+    benchmark(dm._patch, new)
+
+
+@pytest.mark.parametrize("rows", ROWS)
+@pytest.mark.parametrize("appended", [1, 100])
+def test_stream(benchmark, rows, appended):
+    df = frame(rows, 2)
+    dm = DataModel(data=df, name="bench", debug=False)
+    new = changed(df, 0.0, appended=appended)
+
+    benchmark(dm._stream, new)
+
+
+@pytest.mark.parametrize("rows", ROWS[:2])  # apply is a python function call per row
+def test_apply(benchmark, quiet, rows):
+    df = frame(rows, 2)
+    new = changed(df, 0.01, appended=1)
+
+    def setup():
+        dm = DataModel(data=df, name="bench", debug=False)
+        dm.apply(lambda r: r * 2)
+        return (dm,), {}
+
+    benchmark.pedantic(lambda dm: dm(new), setup=setup, rounds=5)
+
+
+@pytest.mark.parametrize("rows", ROWS)
+@pytest.mark.parametrize("depth", [1, 4])
+def test_getitem_chain(benchmark, quiet, rows, depth):
+    df = frame(rows, depth + 1)
+    new = changed(df, 0.01, appended=1)
+
+    def setup():
+        dm = DataModel(data=df, name="bench", debug=False)
+        derived = dm
+        for d in range(depth):
+            # dropping one column at each level
+            derived = derived[[f"c{c}" for c in range(depth - d)]]
+        return (dm,), {}
+
+    benchmark.pedantic(lambda dm: dm(new), setup=setup, rounds=10)
+
+
+@pytest.mark.parametrize("rows", ROWS[:2])
+@pytest.mark.parametrize("documents", DOCUMENTS)
+def test_fanout(benchmark, rows, documents):
+    df = frame(rows, 2)
+    new = changed(df, 0.01, appended=1)
+
+    def setup():
+        dm = DataModel(data=df, name="bench", debug=False)
+        return (dm, attach(dm, documents)), {}
+
+    def update(dm, docs):
+        dm(new)
+        flush(docs)
+
+    benchmark.pedantic(update, setup=setup, rounds=5)
@@ -0,0 +1,23 @@
+"""
+Benchmarks for DataView rendering.
+"""
+import pytest
+
+from livebokeh.datamodel import DataModel
+from livebokeh.dataview import DataView
+
+from .conftest import frame
+
+
+@pytest.mark.parametrize("rows", [1_000, 10_000, 100_000])
+@pytest.mark.parametrize("filtered", [False, True])
+def test_bokeh_view(benchmark, rows, filtered):
+    dm = DataModel(data=frame(rows, 2), name="bench", debug=False)
+    dv = DataView(model=dm, filter=(lambda r: r.c0 > 0) if filtered else None)
+
+    def render():
+        view = dv.bokeh_view()
+        # not keeping track of datasources between rounds
+        dm.detach([view.source])
+
+    benchmark(render)
@@ -0,0 +1,28 @@
+"""
+Benchmarks for import time, in a fresh interpreter each time.
+"""
+import subprocess
+import sys
+
+import pytest
+
+
+@pytest.mark.parametrize(
+    "module",
+    [
+        None,  # interpreter startup, for reference
+        "pandas",  # what the data layer cannot avoid
+        "livebokeh",
+        "livebokeh.datamodel",
+        "livebokeh.dataview",
+        "livebokeh.monosrv",
+    ],
+)
+def test_import(benchmark, module):
+    code = f"import {module}" if module is not None else "pass"
+    benchmark.pedantic(
+        subprocess.run,
+        args=([sys.executable, "-c", code],),
+        kwargs={"check": True},
+        rounds=5,
+    )
@@ -0,0 +1,68 @@
+"""
+Fixtures and data generators for livebokeh benchmarks.
+
+Benchmarks are NOT run with the tests, pass their files explicitly to pytest (requires pytest-benchmark) :
+$ pytest benchmarks/bench_datamodel.py benchmarks/bench_dataview.py benchmarks/bench_import.py --benchmark-json=bench_output.json
+"""
+import typing
+
+import numpy
+import pandas
+import pytest
+from bokeh.document import Document
+
+from livebokeh.datamodel import DataModel
+
+
+def frame(rows: int, cols: int, seed: int = 42) -> pandas.DataFrame:
+    """ a reproducible time-indexed frame """
+    rng = numpy.random.default_rng(seed)
+    return pandas.DataFrame(
+        data=rng.integers(-10, 10, size=(rows, cols)),
+        columns=[f"c{c}" for c in range(cols)],
+        index=pandas.date_range("2020-01-01", periods=rows, freq="s"),
+    )
+
+
+def changed(
+    df: pandas.DataFrame, ratio: float, appended: int = 0, seed: int = 42
+) -> pandas.DataFrame:
+    """ a new version of df, with ratio of its rows modified, and some rows appended """
+    rng = numpy.random.default_rng(seed)
+    new = df.copy()
+    modified = rng.choice(len(df), size=int(len(df) * ratio), replace=False)
+    # values out of the initial range, so that every modified cell is a real change
+    new.iloc[modified] = rng.integers(20, 30, size=(len(modified), len(df.columns)))
+    if appended:
+        more = pandas.DataFrame(
+            data=rng.integers(-10, 10, size=(appended, len(df.columns))),
+            columns=df.columns,
+            index=pandas.date_range(
+                df.index[-1] + pandas.Timedelta(seconds=1), periods=appended, freq="s"
+            ),
+        )
+        new = pandas.concat([new, more])
+    return new
+
+
+def attach(model: DataModel, documents: int) -> typing.List[Document]:
+    """ render the model in some bokeh documents, as a browser session would """
+    docs = list()
+    for _ in range(documents):
+        doc = Document()
+        doc.add_root(model.view.table)
+        docs.append(doc)
+    return docs
+
+
+def flush(docs: typing.List[Document]) -> None:
+    """ run the pending next tick callbacks, as the server loop would """
+    for doc in docs:
+        for cb in list(doc.session_callbacks):
+            cb.callback()
+
+
+@pytest.fixture
+def quiet(monkeypatch):
+    # related models propagation prints on every update
+    monkeypatch.setattr("builtins.print", lambda *args, **kwargs: None)
@@ -0,0 +1,227 @@
+"""
+Headless load test of monosrv : N bokeh.client sessions, no browser needed (Linux only, for /proc).
+
+$ python -m benchmarks.loadtest --sessions 1 10 50 --period 0.1 --rows 10
+$ python -m benchmarks.loadtest --module livebokeh.dataview --sessions 1 10
+
+Prints one JSON line per step (number of sessions), with end-to-end update latency (only for the default producer),
+messages and bytes received per session, server CPU and RSS.
+"""
+import argparse
+import asyncio
+import functools
+import importlib
+import json
+import multiprocessing
+import os
+import statistics
+import threading
+import time
+import typing
+
+import numpy
+import pandas
+
+
+def _producer_app(rows: int, columns: int, period: float, history: int):
+    """ A model updated with timestamped rows, to measure latency on the client side """
+    from livebokeh.datamodel import DataModel
+
+    def stamped(index_start: int) -> pandas.DataFrame:
+        df = pandas.DataFrame(
+            data=numpy.random.default_rng().integers(-10, 10, size=(rows, columns)),
+            columns=[f"c{c}" for c in range(columns)],
+            index=range(index_start, index_start + rows),
+        )
+        df["sent"] = time.time()
+        return df
+
+    model = DataModel(data=stamped(0), name="loadtest", debug=False)
+
+    async def produce():
+        tick = 0
+        while True:
+            await asyncio.sleep(period)
+            tick += 1
+            model(pandas.concat([model.data, stamped(tick * rows)]).iloc[-history:])
+
+    def app(doc):
+        doc.add_root(model.view.table)
+
+    return produce, app
+
+
+def _serve(port: int, module: typing.Optional[str], producer_kwargs: dict):
+    """ server process """
+
+    async def main():
+        from livebokeh.monosrv import monosrv
+
+        if module is None:
+            produce, app = _producer_app(**producer_kwargs)
+            asyncio.create_task(produce())
+        else:
+            m = importlib.import_module(module)
+            example = (
+                await m._internal_example() if hasattr(m, "_internal_example") else None
+            )
+            app = functools.partial(m._internal_bokeh, example=example)
+
+        await monosrv({"/": app}, port=port)
+
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
+
+
+class _Client:
+    """ one bokeh.client session, running its own IOLoop in a thread """
+
+    def __init__(self, url: str):
+        self.url = url
+        self.messages = 0
+        self.bytes = 0
+        self.latencies: typing.List[float] = list()
+        self._ready = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        self._ready.wait(timeout=30)
+
+    def _count(self, fut):
+        if not fut.cancelled() and fut.exception() is None and fut.result() is not None:
+            self.messages += 1
+            self.bytes += len(fut.result())
+
+    def _on_patch(self, message):
+        """ extracts latency from streamed 'sent' values, without deserializing into the client document """
+        # Note : bokeh 2.0 python client fails to deserialize streamed binary buffers anyway.
+        buffers = {
+            (json.loads(h) if isinstance(h, str) else h)["id"]: payload
+            for h, payload in message.buffers
+        }
+        for event in message.content.get("events", []):
+            if event.get("kind") != "ColumnsStreamed" or "sent" not in event["data"]:
+                continue
+            sent = event["data"]["sent"]
+            if isinstance(sent, dict):  # binary buffer
+                sent = numpy.frombuffer(
+                    buffers[sent["__buffer__"]], dtype=sent["dtype"]
+                )
+            if len(sent):
+                self.latencies.append(time.time() - max(sent))
+
+    def _run(self):
+        from bokeh.client import pull_session
+
+        self.session = pull_session(url=self.url)
+        socket = self.session._connection._socket
+        read_message = socket.read_message
+
+        def counting_read_message(callback=None):
+            fut = read_message(callback)
+            fut.add_done_callback(self._count)
+            return fut
+
+        socket.read_message = counting_read_message
+        self.session._handle_patch = self._on_patch
+
+        self._ready.set()
+        self.session._connection.loop_until_closed()
+
+    def reset(self):
+        self.messages = 0
+        self.bytes = 0
+        self.latencies = list()
+
+    def close(self):
+        loop = self.session._connection.io_loop
+        loop.add_callback(self.session.close)
+        self._thread.join(timeout=10)
+
+
+def _cpu_rss(pid: int) -> typing.Tuple[float, int]:
+    """ cumulated cpu seconds and resident bytes of a process """
+    with open(f"/proc/{pid}/stat") as f:
+        fields = f.read().rsplit(")", 1)[1].split()
+    cpu = (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+    rss = int(fields[21]) * os.sysconf("SC_PAGE_SIZE")
+    return cpu, rss
+
+
+def loadtest(
+    sessions: typing.List[int],
+    duration: float = 10.0,
+    port: int = 5006,
+    module: typing.Optional[str] = None,
+    **producer_kwargs,
+) -> typing.Iterator[dict]:
+    server = multiprocessing.Process(
+        target=_serve, args=(port, module, producer_kwargs), daemon=True
+    )
+    server.start()
+    try:
+        time.sleep(3)  # server startup
+        url = f"http://localhost:{port}/"
+        for n in sessions:
+            clients = [_Client(url) for _ in range(n)]
+            time.sleep(1)  # warm up
+            for c in clients:
+                c.reset()
+            cpu_start, _ = _cpu_rss(server.pid)
+            start = time.time()
+
+            time.sleep(duration)
+
+            elapsed = time.time() - start
+            cpu_end, rss = _cpu_rss(server.pid)
+            latencies = [l for c in clients for l in c.latencies]
+            yield {
+                "sessions": n,
+                "duration": elapsed,
+                "latency_mean": statistics.mean(latencies) if latencies else None,
+                "latency_p90": numpy.quantile(latencies, 0.9) if latencies else None,
+                "latency_max": max(latencies) if latencies else None,
+                "messages_per_session": sum(c.messages for c in clients) / n / elapsed,
+                "bytes_per_session": sum(c.bytes for c in clients) / n / elapsed,
+                "server_cpu": (cpu_end - cpu_start) / elapsed,
+                "server_rss": rss,
+            }
+
+            for c in clients:
+                c.close()
+            time.sleep(1)
+    finally:
+        server.terminate()
+        server.join()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 10, 50])
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per step")
+    parser.add_argument("--port", type=int, default=5006)
+    parser.add_argument(
+        "--module", help="livebokeh-style module to serve instead of the producer"
+    )
+    parser.add_argument("--rows", type=int, default=1, help="rows per tick")
+    parser.add_argument("--columns", type=int, default=2)
+    parser.add_argument(
+        "--period", type=float, default=0.1, help="seconds between ticks"
+    )
+    parser.add_argument(
+        "--history", type=int, default=1000, help="rows kept in the model"
+    )
+    args = parser.parse_args()
+
+    for result in loadtest(
+        sessions=args.sessions,
+        duration=args.duration,
+        port=args.port,
+        module=args.module,
+        rows=args.rows,
+        columns=args.columns,
+        period=args.period,
+        history=args.history,
+    ):
+        print(json.dumps(result), flush=True)
@@ -9,6 +9,7 @@ from bokeh.models import PreText
 from stochastic.discrete import MarkovChain
 
 from livebokeh.datamodel import DataModel
+from livebokeh.replay import Replay
 
 
 class LiveMarkovChain:
@@ -23,10 +24,9 @@ class LiveMarkovChain:
         self.pregen_frame = pandas.DataFrame(
             data={"MarkovChain": MarkovChain().sample(sample_size)}
         )
-        self.current = 0
 
         self.model = DataModel(
-            data=self.pregen_frame[: self.current], name="Markov Chain", debug=False
+            data=self.pregen_frame.iloc[:0], name="Markov Chain", debug=False
         )
 
     @property
@@ -37,27 +37,18 @@ class LiveMarkovChain:
     def table(self):
         return self.model.view.table
 
-    def __call__(self):
-        self.current += 1
-        if self.current < len(self.pregen_frame):
-            # simulate dynamic process by making more precomputed data appear...
-            self.model(new_data=self.pregen_frame[: self.current])
-        else:
-            # resetting data
-            self.pregen_frame = pandas.DataFrame(
-                data={"MarkovChain": MarkovChain().sample(self.sample_size)}
-            )
-            self.current = 0
-            self.model(new_data=self.pregen_frame[: self.current])
+    def replay(self, period=0.2) -> Replay:
+        # simulate dynamic process by making more precomputed data appear, row by row.
+        # Looping continues the index, instead of resetting the data.
+        return Replay(self.pregen_frame, rate=1 / period, loop=True)
 
 
 ld = LiveMarkovChain()
 
 
 async def simulate():
-    while True:  # looping over each step
-        ld()
-        await asyncio.sleep(0.2)
+    # each step is streamed to the model, without diffing the rows before
+    await ld.model.ingest(ld.replay(), until_detached=False)
 
 
 def livebokeh(doc):
@@ -1,32 +1,24 @@
 import asyncio
 import inspect
-import typing
 
-import pandas
 from bokeh.layouts import layout
 from bokeh.models import PreText
 
-from stochastic.discrete import RandomWalk
-
 from livebokeh.datamodel import DataModel
+from livebokeh.simulation import Paths, random_walk
 
 
 class LiveRandomWalk:
 
     model: DataModel
-    pregen_frame: pandas.DataFrame
-    sample_size: int
-
-    def __init__(self, sample_size=255):
-        self.sample_size = sample_size
+    paths: Paths
 
-        self.pregen_frame = pandas.DataFrame(
-            data={"RandomWalk": RandomWalk().sample(sample_size)}
-        )
-        self.current = 0
+    def __init__(self, paths=8, seed=None):
+        # all paths advance together, in one vectorized step
+        self.paths = Paths(random_walk(), paths=paths, seed=seed, period=0.2)
 
         self.model = DataModel(
-            data=self.pregen_frame[: self.current], name="Random Walk", debug=False
+            data=self.paths.advance(), name="Random Walks", debug=False
         )
 
     @property
@@ -37,27 +29,13 @@ class LiveRandomWalk:
     def table(self):
         return self.model.view.table
 
-    def __call__(self):
-        self.current += 1
-        if self.current < len(self.pregen_frame):
-            # simulate dynamic process by making more precomputed data appear...
-            self.model(new_data=self.pregen_frame[: self.current])
-        else:
-            # resetting data
-            self.pregen_frame = pandas.DataFrame(
-                data={"RandomWalk": RandomWalk().sample(self.sample_size)}
-            )
-            self.current = 0
-            self.model(new_data=self.pregen_frame[: self.current])
-
 
 ld = LiveRandomWalk()
 
 
 async def simulate():
-    while True:  # looping over each step
-        ld()
-        await asyncio.sleep(0.2)
+    # each step of all paths is streamed to the model, as one delta
+    await ld.model.ingest(ld.paths, until_detached=False)
 
 
 def livebokeh(doc):
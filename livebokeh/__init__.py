@@ -1,4 +1,11 @@
-from . import monosrv
-from . import datamodel
+import importlib
 
 __all__ = ["monosrv", "datamodel"]
+
+
+def __getattr__(name):
+    # submodules are imported on first access only :
+    # monosrv brings in bokeh server and tornado, which the data layer does not need.
+    if name in __all__:
+        return importlib.import_module(f".{name}", __name__)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,40 +1,69 @@
 # TODO : run livebokeh on itself : provide a visualization of package content...
+# Note : the metrics module already renders the livebokeh update pipeline with livebokeh.
 
 import asyncio
-import functools
+import os
 
-from livebokeh import monosrv, datamodel, clockdata, dataview
+from livebokeh import monosrv
 
 
 async def main():
     # Note we need an async main here to ensure a loop is currently running.
 
-    # retrieving all modules
-    modls = [monosrv, datamodel, dataview, clockdata]
+    # all modules, by name : they are imported on their first session only.
+    modls = [
+        "livebokeh.monosrv",
+        "livebokeh.datamodel",
+        "livebokeh.dataview",
+        "livebokeh.clockdata",
+        "livebokeh.metrics",
+    ]
 
-    # launching all examples, BEFORE web request
-    # to make sure livebokeh code does NOT depend on doc being there
+    # keeping models history across restarts, if a directory is provided.
+    snapshot_path = os.environ.get("LIVEBOKEH_SNAPSHOTS")
+    on_started = on_stopped = None
+    if snapshot_path is not None:
+        from livebokeh.snapshot import Snapshots
 
-    examples = {
-        # We need to start all examples in background
-        # => async (this is scheduled in the current server loop)
-        m.__name__: await m._internal_example()  # we do need to get a first result from the exemple to certify startup.
-        for m in modls
-        if hasattr(m, "_internal_example")
-    }
+        snapshots = Snapshots(snapshot_path)
+
+        def on_started(lazy: monosrv.LazyModule):
+            # Note : example producers have not run yet, they will continue from the restored data.
+            for model in lazy.models:
+                try:
+                    snapshots.register(model)
+                except (KeyError, TypeError) as e:
+                    print(f"Not snapshotting {model._name}: {e}")
 
-    livebokeh_mains = {
-        m.__name__: functools.partial(
-            m._internal_bokeh, example=examples.get(m.__name__)
+        def on_stopped(lazy: monosrv.LazyModule):
+            # the next start creates new models with the same names, restored from this last snapshot.
+            for model in lazy.models:
+                snapshots.unregister(model)
+
+        asyncio.create_task(snapshots.run())
+
+    # examples are started on the first web request for their route, NOT before.
+    # livebokeh code still does NOT depend on doc being there : the example is started before the document is built.
+    apps = {
+        "/"
+        + m: monosrv.LazyModule(
+            m,
+            stop_when_unused=bool(os.environ.get("LIVEBOKEH_STOP_UNUSED")),
+            on_started=on_started,
+            on_stopped=on_stopped,
         )
         for m in modls
-        if hasattr(m, "_internal_bokeh")
     }
 
-    # retrieving livebokeh entry points for each module, with optional example
-    apps = {"/" + m.__name__: livebokeh_mains.get(m.__name__) for m in modls}
+    # sampling the server loop, served on /profile, if LIVEBOKEH_PROFILE is set.
+    # It can be stopped and started again at runtime from there.
+    profiler = None
+    if os.environ.get("LIVEBOKEH_PROFILE"):
+        from livebokeh.profiler import SamplingProfiler
+
+        profiler = SamplingProfiler().start()
 
-    await monosrv.monosrv(apps)
+    await monosrv.monosrv(apps, profiler=profiler)
 
 
 try:
@@ -6,14 +6,12 @@ from datetime import datetime, timedelta
 import pandas
 import typing
 
-from bokeh.layouts import column, grid
-from bokeh.models import DataTable, DateFormatter, PreText, TableColumn
-from bokeh.palettes import viridis
-from bokeh.plotting import Figure
-
-from livebokeh.dataview import DataView
 from .datamodel import DataModel
 
+# bokeh is imported only when rendering : ticking the clock should not need it.
+if typing.TYPE_CHECKING:
+    from bokeh.models import DataTable
+
 
 class Clock:
     """ A class representing the internal clock of this process as a datamodel.
@@ -82,7 +80,8 @@ clock = Clock()
 
 
 def _internal_bokeh(doc, example=None):
-    from bokeh.layouts import row
+    from bokeh.layouts import grid
+    from bokeh.models import PreText
     import asyncio
 
     async def clock_retrieve(period_secs: float, ttyout=False) -> None:
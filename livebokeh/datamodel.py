@@ -3,26 +3,175 @@ Data Driven Bokeh
 """
 from __future__ import annotations
 
+import asyncio
 import functools
 import inspect
+import queue
 import sys
+import threading
+import time
+import weakref
 from collections import namedtuple
 
+import numpy
 import pandas
 import typing
-from bokeh.document import Document
-from bokeh.layouts import column, grid, layout, row
-from bokeh.plotting import Figure
-from bokeh.models import (
-    ColumnDataSource,
-    GlyphRenderer,
-    Plot,
-    DataTable,
-    PreText,
-    TableColumn,
-    DateFormatter,
-)
-from bokeh.util.serialization import convert_datetime_array, convert_datetime_type
+
+from livebokeh.dtypes import DtypePolicy, epoch_ms
+from livebokeh.metrics import ModelMetrics
+from livebokeh.storage import ColumnFiles
+
+# bokeh is imported only when rendering : a headless producer should not pay for it.
+if typing.TYPE_CHECKING:
+    from bokeh.document import Document
+    from bokeh.models import ColumnDataSource
+
+
+# What changed in the last update, by index label : appended rows, and modified rows (with their new values).
+# rolled is the number of first rows dropped, None if rows were removed or reordered (data replaced).
+# sequence numbers the updates of a model, received is when the update entered it (time.perf_counter).
+Delta = namedtuple("Delta", ["stream", "patch", "rolled", "sequence", "received"])
+
+
+def _merged(batch: typing.List[pandas.DataFrame]) -> pandas.DataFrame:
+    """ one frame from row batches, the last value wins for a label in different batches. """
+    merged = pandas.concat(batch) if len(batch) > 1 else batch[0]
+    return merged[~merged.index.duplicated(keep="last")]
+
+
+def _patch_bytes(cells: int, runs: int) -> int:
+    """ rough size of a patch on the wire : json text, for each value and each run of rows. """
+    return 16 * cells + 32 * runs
+
+
+def _runs(positions: numpy.ndarray, values: numpy.ndarray) -> list:
+    """ bokeh patch of one column : a slice for each run of contiguous rows, an index for single ones. """
+    order = numpy.argsort(positions, kind="stable")
+    positions, values = positions[order], values[order]
+    breaks = (numpy.flatnonzero(numpy.diff(positions) != 1) + 1).tolist()
+    listed, pos = values.tolist(), positions.tolist()  # python scalars for single rows
+    patch = list()
+    for start, stop in zip([0] + breaks, breaks + [len(pos)]):
+        if stop - start == 1:
+            patch.append((pos[start], listed[start]))
+        else:
+            patch.append((slice(pos[start], pos[stop - 1] + 1), values[start:stop]))
+    return patch
+
+
+def _keys(index: pandas.Index) -> list:
+    """ plain python values of index labels, quicker to hash than pandas Timestamps. """
+    return index.to_numpy().tolist()
+
+
+class _Positions:
+    """ Row positions of index labels in the model datasources, kept through streams, rollovers and removals.
+
+    Datasources rows are in the same order as the model data (see DataModel._apply).
+    A sorted index is binary searched, otherwise a label -> position dict is maintained.
+    """
+
+    def __init__(self):
+        self._map: typing.Optional[
+            typing.Dict[typing.Hashable, int]
+        ] = None  # built on first use
+        self._offset = 0  # rows rolled over since the map was built
+
+    def _mapped(self, index: pandas.Index) -> typing.Dict[typing.Hashable, int]:
+        if self._map is None:
+            self._map = dict(zip(_keys(index), range(len(index))))
+            self._offset = 0
+        return self._map
+
+    def known(self, index: pandas.Index, labels: pandas.Index) -> numpy.ndarray:
+        """ mask of labels in index. """
+        if index.is_monotonic_increasing:
+            if not len(index):
+                return numpy.zeros(len(labels), dtype=bool)
+            positions = index.searchsorted(labels).clip(max=len(index) - 1)
+            return numpy.asarray(index[positions] == labels)
+        mapped = self._mapped(index)
+        return numpy.fromiter(
+            (k in mapped for k in _keys(labels)), dtype=bool, count=len(labels)
+        )
+
+    def locate(self, index: pandas.Index, labels: pandas.Index) -> numpy.ndarray:
+        """ positions of labels, all in index. """
+        if index.is_monotonic_increasing:
+            self._map = None  # not needed
+            return index.searchsorted(labels)
+        mapped = self._mapped(index)
+        return (
+            numpy.fromiter(
+                (mapped[k] for k in _keys(labels)), dtype=int, count=len(labels)
+            )
+            - self._offset
+        )
+
+    def streamed(self, labels: pandas.Index, start: int) -> None:
+        """ labels appended after start rows. """
+        if self._map is not None:
+            first = start + self._offset
+            self._map.update(zip(_keys(labels), range(first, first + len(labels))))
+
+    def rolled(self, labels: pandas.Index) -> None:
+        """ first rows dropped. """
+        if self._map is not None:
+            for k in _keys(labels):
+                del self._map[k]
+            self._offset += len(labels)
+
+    def reset(self) -> None:
+        """ rows removed or reordered, the map is rebuilt on next use. """
+        self._map = None
+
+
+class _ChangeLog:
+    """ The rows touched by each version of a model, to bring a datasource from an older version to the current one.
+
+    A version is the sequence number of an update (see Delta). Only the last max_versions are kept.
+    """
+
+    def __init__(self, version: int, length: int, max_versions: int = 1000):
+        self.max_versions = max_versions
+        # version -> (rows after it, first rows dropped or None if replaced, patched labels)
+        self._changes: typing.Dict[
+            int, typing.Tuple[int, typing.Optional[int], pandas.Index]
+        ] = dict()
+        self._first, self._length = (
+            version,
+            length,
+        )  # the oldest version known, and its rows
+
+    def append(self, delta: Delta, length: int) -> None:
+        self._changes[delta.sequence] = (length, delta.rolled, delta.patch.index)
+        if len(self._changes) > self.max_versions:
+            self.prune(self._first + 1)
+
+    def since(
+        self, version: int
+    ) -> typing.Optional[typing.Tuple[int, int, pandas.Index]]:
+        """ rows at version, first rows dropped and labels patched since. None if data was replaced. """
+        if version < self._first:
+            return None
+        length = self._changes[version][0] if version > self._first else self._length
+        rolled, patched = 0, list()
+        for v in range(version + 1, self._first + len(self._changes) + 1):
+            _, dropped, labels = self._changes[v]
+            if dropped is None:
+                return None
+            rolled += dropped
+            patched.append(labels)
+        patched = (
+            patched[0].append(patched[1:]).unique() if patched else pandas.Index([])
+        )
+        return length, rolled, patched
+
+    def prune(self, version: int) -> None:
+        """ forgets versions before this one. """
+        while self._first < version:
+            self._first += 1
+            self._length = self._changes.pop(self._first)[0]
 
 
 class DataModel:  # rename ? "LiveFrame"
@@ -34,21 +183,184 @@ class DataModel:  # rename ? "LiveFrame"
     # REMINDER : document is a property of bokeh's datasource
 
     # in a sense, the compute graph of models indexed from this one (one level only)...
-    _related_models: typing.Dict[typing.List[str], functools.partial]
+    _related_models: typing.Dict[typing.Hashable, functools.partial]
+
+    # all models alive in this process, so server-side code can find them back (see monosrv).
+    # weak, as we should not prevent the garbage collection of a model nobody uses anymore.
+    _instances: typing.ClassVar[weakref.WeakSet] = weakref.WeakSet()
+
+    @classmethod
+    def instances(cls) -> typing.List[DataModel]:
+        return list(cls._instances)
 
     @property
     def columns(self):
         return self._data.columns
 
+    @property
+    def attached(self) -> int:
+        """ number of datasources currently in a document, therefore updated. """
+        return sum(1 for r in self._rendered_datasources if r.document is not None)
+
+    def _pushed(self) -> typing.List[ColumnDataSource]:
+        """ datasources updated on each update : in a document, not pulling. """
+        return [
+            r
+            for r in self._rendered_datasources
+            if r.document is not None and r.document not in self._pulling
+        ]
+
+    def pull(self, document: Document, period_ms: int = 1000):
+        """ Datasources of this model in document are not pushed each update anymore.
+        Every period_ms, they pull the net change since their last version instead, with the latest values only.
+        Each document can pull at its own rate, intermediate updates are never sent.
+        """
+        self._pulling.add(document)
+        for r in self._rendered_datasources:
+            if r.document is document:
+                self._versions[id(r)] = self.delta.sequence
+        return document.add_periodic_callback(
+            functools.partial(self._pull, document), period_ms
+        )
+
+    def _pull(self, document: Document) -> None:
+        for r in self._rendered_datasources:
+            if r.document is document:
+                self._catch_up(r)
+
+    def _catch_up(self, source: ColumnDataSource) -> None:
+        """ brings source from its version to the current one. """
+        version = self._versions.get(id(source), self.delta.sequence)
+        self._versions[id(source)] = self.delta.sequence
+        if version == self.delta.sequence:
+            return
+        since = self._log.since(version)
+        if since is not None:
+            length, rolled, patched = since
+            # the first rows of data were in source already. None if more rows rolled off than source had :
+            # then all data is streamed, and the rollover drops all source rows.
+            kept = max(length - rolled, 0)
+            # dropped rows only, a stream cannot do it
+            if rolled and kept == len(self._data):
+                since = None
+        if since is None:  # out of the log
+            self.metrics.resyncs += 1
+            self.metrics.queued(source.document, int(self._data.memory_usage().sum()))
+            source.data = self._snapshot()
+            return
+
+        patched = patched[self._known(patched)]
+        positions = self._positions.locate(self._data.index, patched)
+        positions = positions[positions < kept]  # later ones are streamed anyway
+        if len(positions):
+            rows = self._data.iloc[positions]
+            self.metrics.queued(source.document, _patch_bytes(rows.size, rows.size))
+            # Note : applied before the stream, on the previous rows.
+            source.patch(
+                {
+                    c: _runs(positions + rolled, self._source_array(rows[c].to_numpy()))
+                    for c in rows.columns
+                }
+            )
+        if len(self._data) > kept:
+            streamable = self._data.iloc[kept:]
+            self.metrics.queued(source.document, int(streamable.memory_usage().sum()))
+            source.stream(
+                self._source_data(streamable),
+                rollover=len(self._data) if rolled else None,
+            )
+
+    def _schedule(
+        self,
+        document: Document,
+        callback: typing.Callable[[], None],
+        received: typing.Optional[float] = None,
+    ):
+        """ add_next_tick_callback, keeping track of pending callbacks, and of their latency since received. """
+        self.metrics.pending_callbacks += 1
+
+        def tracked():
+            self.metrics.pending_callbacks -= 1
+            if received is not None:
+                self.metrics.callback_latency.observe(time.perf_counter() - received)
+            callback()
+
+        return document.add_next_tick_callback(tracked)
+
+    def _send(
+        self,
+        source: ColumnDataSource,
+        steps: typing.List[typing.Callable[[ColumnDataSource], None]],
+        delta: Delta,
+    ) -> None:
+        """ next tick callback : sends delta to source, or all changes since its version if there were more. """
+        self._sending.discard(id(source))
+        if source.document is None:  # detached meanwhile
+            return
+        if (
+            self.delta.sequence == delta.sequence
+            and self._versions.get(id(source)) == delta.sequence - 1
+        ):
+            for step in steps:
+                step(source)
+            self._versions[id(source)] = delta.sequence
+        else:
+            self._catch_up(source)
+        if self._trace is not None:
+            self._traced(source, self.delta)
+
+    def _snapshot(self) -> typing.Dict[str, typing.Any]:
+        """ datasource data of the current version, converted once for all datasources needing it. """
+        if self._snapshot_data is None or self._snapshot_data[0] != self.delta.sequence:
+            self._snapshot_data = (self.delta.sequence, self._source_data(self._data))
+        # copied : datasources patch their arrays in place.
+        return {c: numpy.array(v, copy=True) for c, v in self._snapshot_data[1].items()}
+
+    def _traced(self, source: ColumnDataSource, delta: Delta):
+        """ to run after delta was sent to this datasource. """
+        if self._trace == "browser":
+            # sent after the update, the browser sends it back once applied (see source).
+            source.tags = [delta.sequence]
+
+        def written():
+            self.metrics.written_latency.observe(time.perf_counter() - delta.received)
+
+        # Note : a bokeh session writes the messages of a callback before it runs the next one.
+        source.document.add_next_tick_callback(written)
+
+    def _acked(self, attr, old, new):
+        """ the browser applied the update new[0]. """
+        received = self._received.get(new[0]) if new else None
+        if received is not None:
+            self.metrics.browser_latency.observe(time.perf_counter() - received)
+
     def _stream(
         self, compared_to: pandas.DataFrame
     ) -> typing.Optional[pandas.DataFrame]:
 
-        # Attempting to discover appends based on index...
         data_index = self._data.index
-        appended_index = compared_to.index.difference(data_index)
-        # TODO : double check, seems buggy...
-        streamable = compared_to.loc[appended_index]
+        streamable = None
+        if (
+            data_index.is_monotonic_increasing
+            and compared_to.index.is_monotonic_increasing
+        ):
+            # time-indexed : appends are after the last known label, found by binary search.
+            pos = (
+                compared_to.index.searchsorted(data_index[-1], side="right")
+                if len(data_index)
+                else 0
+            )
+            # and no row was inserted or removed before (cheap check, but it should be the common case)
+            if pos == len(data_index) and (
+                pos == 0 or compared_to.index[pos - 1] == data_index[-1]
+            ):
+                streamable = compared_to.iloc[pos:]  # a slice, no copy
+
+        if streamable is None:
+            # Attempting to discover appends based on index...
+            appended_index = compared_to.index.difference(data_index)
+            # TODO : double check, seems buggy...
+            streamable = compared_to.loc[appended_index]
 
         if streamable.any(axis="columns").any():
             # TODO: log stream detected properly
@@ -57,41 +369,94 @@ class DataModel:  # rename ? "LiveFrame"
 
         return streamable
 
-    def _patch(self, compared_to: pandas.DataFrame) -> typing.Dict[str, list]:
+    def _known(self, index: pandas.Index) -> numpy.ndarray:
+        """ mask of index labels already in data. """
+        return self._positions.known(self._data.index, index)
+
+    def _rows(self, labels: pandas.Index) -> pandas.DataFrame:
+        """ rows of data for labels, NaN for unknown ones. Found by position, without hashing the whole index. """
+        known = self._known(labels)
+        rows = self._data.iloc[self._positions.locate(self._data.index, labels[known])]
+        return rows if known.all() else rows.reindex(labels)
+
+    def _patchable(self, compared_to: pandas.DataFrame) -> pandas.DataFrame:
+        """ rows of compared_to already in data, but with different values. """
+
+        if compared_to.index.equals(self._data.index):
+            # same rows (a full update without appends), compared as they are
+            available_patches, current = compared_to, self._data
+        else:
+            available_patches = compared_to[self._known(compared_to.index)]
+            if available_patches.empty:
+                return compared_to.iloc[:0]
+            # only patch data differences, comparing with current values of these rows only.
+            current = self._data.iloc[
+                self._positions.locate(self._data.index, available_patches.index)
+            ]
+        same = numpy.ones(len(available_patches), dtype=bool)
+        for c in available_patches.columns:
+            if c not in current:
+                same[:] = False
+                continue
+            new_values = available_patches[c].to_numpy()
+            values = current[c].to_numpy()
+            same &= (new_values == values) | (
+                pandas.isna(new_values) & pandas.isna(values)
+            )
+        patchable = available_patches[~same]
+
+        if not patchable.empty:
+            # TODO: log patch detected properly
+            if self._debug:
+                print(f"Patch update: \n{patchable}")
+        return patchable
 
-        # Attempting to discover patches based on index...
-        data_index = self._data.index
-        patched_index = compared_to.index.intersection(data_index)
-        # TODO : double check, seems buggy...
-        available_patches = compared_to.loc[patched_index]
+    def _patch(
+        self,
+        compared_to: pandas.DataFrame,
+        patchable: typing.Optional[pandas.DataFrame] = None,
+    ) -> typing.Dict[str, list]:
+
+        if patchable is None:
+            patchable = self._patchable(compared_to)
 
-        # if we have some potential patches
         patches = dict()
-        if available_patches.any(axis="columns").any():
-            # only patch data differences
-            patchfilter = available_patches.isin(
-                self._data
-            )  # TODO : prevent "ValueError: cannot compute isin with a duplicate axis."
-            patchable_indices = patchfilter[~patchfilter.all(axis="columns")].index
-            patchable = available_patches.loc[patchable_indices]
-
-            if patchable.any(axis="columns").any():
-                # TODO: log patch detected properly
-                if self._debug:
-                    print(f"Patch update: \n{patchable}")
-
-                # Note : seems we need the integer index for patch, not the timestamp integer...
-                for col, pseries in patchable.reset_index(drop=True).items():
-                    patches[col] = [t for t in pseries.items()]
-
-        # asserting the quality of patches (to have a chance to break early and debug)
-        # for c, p in patches.items():
-        #     assert c in self._data.columns, f"{c} not in {self._data.columns}"
-        #     for pe in p:
-        #         assert 0 <= pe[0] < len(self._data[c]), f"Patch index should be {0} <= {pe[0]} < {len (self._data[c])}"
-
-        # TODO: investigate exception on document load : ValueError: Out-of bounds index (3) in patch for column: random1
-        # PRobably teh patch is computed against data, but the document data is not uptodate ?
+        if patchable.empty:
+            return patches
+
+        # Note : bokeh patches rows by position in the datasource, not by index label.
+        positions = self._positions.locate(self._data.index, patchable.index)
+        current = self._data.iloc[positions]
+        for col, pseries in patchable.items():
+            values = pseries.to_numpy()
+            if col in current:  # only changed cells
+                old_values = current[col].to_numpy()
+                changed = ~(
+                    (values == old_values)
+                    | (pandas.isna(values) & pandas.isna(old_values))
+                )
+                if not changed.any():
+                    continue
+                col_positions, values = positions[changed], values[changed]
+            else:
+                col_positions = positions
+            values = self._source_array(values)  # as in datasources
+
+            runs = (
+                int(numpy.count_nonzero(numpy.diff(numpy.sort(col_positions)) != 1)) + 1
+            )
+            itemsize = values.dtype.itemsize if values.dtype != object else 16
+            if col in current and len(self._data) * itemsize < _patch_bytes(
+                len(values), runs
+            ):
+                # most of the column changed : cheaper to replace it (see _apply)
+                column = self._data[col].copy()
+                column.iloc[col_positions] = pseries.to_numpy()[changed]
+                patches[col] = [
+                    (slice(0, len(self._data)), self._source_array(column.to_numpy()))
+                ]
+            else:
+                patches[col] = _runs(col_positions, values)
 
         return patches
 
@@ -99,14 +464,109 @@ class DataModel:  # rename ? "LiveFrame"
     def data(self):  # to mark it read-only. use __call__ for update.
         return self._data
 
+    def _spilled(self, data: pandas.DataFrame) -> pandas.DataFrame:
+        """ writes cold rows to disk, returns the hot ones. """
+        if self._spill is None or len(data) <= self._hot_rows:
+            return data
+        self._spill.append(data.iloc[: -self._hot_rows])
+        return data.iloc[-self._hot_rows :]
+
+    def history(
+        self, start=None, stop=None, max_rows: typing.Optional[int] = None
+    ) -> pandas.DataFrame:
+        """ Data between start and stop index labels (included), cold rows are read from disk.
+        max_rows decimates the result, to load only what is needed for display.
+        """
+        hot = self._data.loc[start:stop]
+        if self._spill is None or not len(self._spill):
+            cold = self._data.iloc[:0]
+        else:
+            first = self._spill.locate(start, "left") if start is not None else 0
+            last = (
+                self._spill.locate(stop, "right")
+                if stop is not None
+                else len(self._spill)
+            )
+            step = (
+                max(1, -(-(last - first + len(hot)) // max_rows))  # ceil division
+                if max_rows
+                else 1
+            )
+            cold = self._spill.read(first, last, step)
+            hot = hot.iloc[::step]
+        return pandas.concat([cold, hot]) if len(cold) else hot
+
     @property
     def source(self):
-        src = ColumnDataSource(data=self._data, name=self._name)
+        from bokeh.models import ColumnDataSource
+
+        # new documents at the same version, after a reconnect for instance, share the conversion.
+        src = ColumnDataSource(data=self._snapshot(), name=self._name)
+        self._versions[id(src)] = self.delta.sequence
+        if self._trace == "browser":
+            from bokeh.models import CustomJS, Div
+
+            # any model will do to send the sequence back, it is only referenced by the callback.
+            ack = Div(visible=False)
+            ack.on_change("tags", self._acked)
+            src.js_on_change(
+                "tags", CustomJS(args=dict(ack=ack), code="ack.tags = cb_obj.tags")
+            )
         self._rendered_datasources.append(src)
         # TODO : how to prune this list ? shall we ever ?
         # note that _detach_document seems to be called properly by bokeh and datasource's document is set to None.
+        # => monosrv calls detach() when a session is destroyed.
         return src
 
+    @staticmethod
+    def _source_data(data: pandas.DataFrame) -> typing.Dict[str, typing.Any]:
+        """ columns as datasources take them, computed once for all of them.
+
+        datetimes are converted to epoch milliseconds here,
+        otherwise bokeh converts them again for each document, on each serialization.
+        """
+        from bokeh.models import ColumnDataSource
+
+        return {
+            c: DataModel._source_array(v)
+            for c, v in ColumnDataSource._data_from_df(data).items()
+        }
+
+    @staticmethod
+    def _source_array(values) -> typing.Any:
+        if isinstance(values, pandas.Categorical):  # cannot be streamed by bokeh
+            return numpy.asarray(values, dtype=object)
+        if isinstance(values, numpy.ndarray) and values.dtype.kind == "M":
+            return epoch_ms(values)
+        return values
+
+    def _compact(self, rows: pandas.DataFrame) -> pandas.DataFrame:
+        """ rows with the dtypes of the model, if it has a dtype policy. """
+        if self._dtypes is None:
+            return rows
+        rows = self._dtypes(rows, like=self._data)
+        # datasources have arrays of the narrower integers, that cannot hold rows : they are resynced (see _apply).
+        self._resync = self._resync or bool(DtypePolicy.widened(self._data, rows))
+        self._data = DtypePolicy.extend(
+            self._data, rows
+        )  # new categories, wider integers
+        return rows
+
+    def detach(self, sources: typing.Iterable[ColumnDataSource]) -> DataModel:
+        """ Stop updating these datasources, usually because their session has been destroyed. """
+        detached = {id(s) for s in sources}
+        self._rendered_datasources = [
+            r for r in self._rendered_datasources if id(r) not in detached
+        ]
+        for d in detached:
+            self._versions.pop(d, None)
+        documents = {
+            id(r.document) for r in self._rendered_datasources if r.document is not None
+        }
+        for d in set(self.metrics.bytes_queued) - documents:
+            del self.metrics.bytes_queued[d]
+        return self
+
     @property
     def view(self):
         from livebokeh.dataview import DataView
@@ -117,10 +577,38 @@ class DataModel:  # rename ? "LiveFrame"
 
     """ class representing one viewplot - potentially rendered in multiple documents """
 
-    def __init__(self, data: pandas.DataFrame, name: str, debug=True):
+    def __init__(
+        self,
+        data: pandas.DataFrame,
+        name: str,
+        debug=True,
+        spill: typing.Optional[ColumnFiles] = None,
+        hot_rows: int = 10000,
+        dtypes: typing.Optional[DtypePolicy] = None,
+        trace: typing.Optional[str] = None,
+        log_versions: int = 1000,
+    ):
+        """ With spill, only the last hot_rows are kept in memory, older rows are written to disk.
+        Rows already spilled are immutable : later updates to them are ignored.
+        With dtypes, all data is converted when entering the model (see DtypePolicy).
+        Latencies since an update entered the model are in its metrics : after diffing, and when callbacks run.
+        With trace "written", also when the update is written to the session websockets,
+        and with "browser", when browsers applied it (for datasources created afterwards).
+        The last log_versions changes are kept, to bring a datasource from its version to the current one
+        (pulling, or lagging behind). Datasources further behind are sent the full data.
+        """
+        if trace not in (None, "written", "browser"):
+            raise TypeError(f"trace {trace} is not one of None, 'written', 'browser'.")
+        self._trace = trace
+        # received time of the last traced updates, by sequence, to match browser acks.
+        self._received: typing.Dict[int, float] = dict()
         self._debug = debug
         self._name = name
 
+        self._dtypes = dtypes
+        if dtypes is not None:
+            data = dtypes(data)
+
         # make sure index values are unique (set semantics, or some operations might fail later on...)
         if not data.index.is_unique:
             raise TypeError(
@@ -128,11 +616,50 @@ class DataModel:  # rename ? "LiveFrame"
                 "If in doubt, keep pandas' default index."
             )
 
-        self._data = data
+        # history on disk is searched by index, it has to be sorted.
+        if spill is not None and not data.index.is_monotonic_increasing:
+            raise TypeError(f"{data.index} has to be sorted to spill history to disk.")
+
+        self._spill = spill
+        self._hot_rows = hot_rows
+
+        self._data = self._spilled(data)
+        self._positions = _Positions()
         self._rendered_datasources = list()
         # a set here is fine, it is never included in the bokeh document
 
         self._related_models = dict()
+        # plain callbacks, called with the model after each update (see snapshot)
+        self._update_callbacks: typing.List[typing.Callable[[DataModel], None]] = list()
+        self.delta = Delta(
+            stream=data.iloc[:0],
+            patch=data.iloc[:0],
+            rolled=0,
+            sequence=0,
+            received=time.perf_counter(),
+        )
+
+        # documents pulling changes (see pull), the version of each datasource, and the changes since.
+        self._pulling: weakref.WeakSet = weakref.WeakSet()
+        self._versions: typing.Dict[int, int] = dict()
+        self._log = _ChangeLog(
+            self.delta.sequence, len(self._data), max_versions=log_versions
+        )
+        # datasources with an update waiting to be sent
+        self._sending: typing.Set[int] = set()
+        # the next update replaces datasources data, instead of patching and streaming it
+        self._resync = False
+        self._snapshot_data: typing.Optional[
+            typing.Tuple[int, typing.Dict[str, typing.Any]]
+        ] = None
+
+        self.metrics = ModelMetrics()
+        DataModel._instances.add(self)
+
+    def on_update(self, callback: typing.Callable[[DataModel], None]) -> DataModel:
+        """ callback will be called after each update, with this model. self.delta describes the update. """
+        self._update_callbacks.append(callback)
+        return self
 
     # TODO : cleaner API. This is one of apply|map|applymap of pandas. we should probably stay close to their API...
     def apply(self, elem_fun: typing.Callable[[typing.Any], typing.Any]):
@@ -170,6 +697,40 @@ class DataModel:  # rename ? "LiveFrame"
         # the lifted function will immediately get model_in=self, since we are using this instance's list()...
         return wrapped(model_in=self)
 
+    def join(
+        self, other: DataModel, how: str = "outer", lsuffix: str = "", rsuffix: str = ""
+    ) -> DataModel:
+        """ A model joining this one and other on their index, updated incrementally (see operators.join). """
+        from livebokeh.operators import join
+
+        return join(self, other, how=how, lsuffix=lsuffix, rsuffix=rsuffix)
+
+    def rolling(self, window: typing.Union[int, str], agg: str = "mean") -> DataModel:
+        """ A model of rolling window aggregates, updated incrementally (see operators.rolling). """
+        from livebokeh.operators import rolling
+
+        return rolling(self, window, agg=agg)
+
+    def resample(self, rule: str, agg: str = "mean") -> DataModel:
+        """ A model of time bucket aggregates, updated incrementally (see operators.resample). """
+        from livebokeh.operators import resample
+
+        return resample(self, rule, agg=agg)
+
+    def groupby(
+        self, by: typing.Union[str, typing.List[str]], agg: str = "mean"
+    ) -> DataModel:
+        """ A model of aggregates by group, updated incrementally (see operators.groupby). """
+        from livebokeh.operators import groupby
+
+        return groupby(self, by, agg=agg)
+
+    def eval(self, expr: str) -> DataModel:
+        """ A model with columns computed from expr, on delta rows only (see operators.eval). """
+        from livebokeh.operators import eval
+
+        return eval(self, expr)
+
     def __getitem__(self, item: typing.List[str]):  # TODO: better typing than str ?
         #  indexing by columns (operation on types), comparable to type indexed families, see Martin-Loef Type Theory
         #  somewhat dual to DataView indexing by rows / elements (operation on values)
@@ -179,10 +740,9 @@ class DataModel:  # rename ? "LiveFrame"
         ):  # making explicit only one possible case in python...
 
             # CAREFUL : we should guarantee unicity here, because of compute storage:
-            if item in self._related_models:
-                return self._related_models[
-                    item
-                ]()  # CAREFUL with datasources and views
+            key = tuple(item)  # a list is not hashable
+            if key in self._related_models:
+                return self._related_models[key]()  # CAREFUL with datasources and views
 
             # Note : __getitem__ is already lifted by pandas,
             # and we don't want to slow it down (by going down to rows and back)
@@ -204,7 +764,7 @@ class DataModel:  # rename ? "LiveFrame"
                     )
 
                     # we store the (runnable/updatable) relation
-                    model_in._related_models[item] = functools.partial(
+                    model_in._related_models[key] = functools.partial(
                         wrapped, model_in=model_in, model_out=model_out
                     )
                 return model_out
@@ -218,6 +778,7 @@ class DataModel:  # rename ? "LiveFrame"
         self, new_data: typing.Optional[pandas.DataFrame] = None, name=None, debug=None
     ) -> DataModel:
         """ To schedule optimal push of detected data changes. """
+        received = time.perf_counter()
 
         if name is not None:
             self._name = name
@@ -231,41 +792,310 @@ class DataModel:  # rename ? "LiveFrame"
                 "If in doubt, keep pandas' default index."
             )
 
-        patches = self._patch(new_data)
+        new_data = self._compact(new_data)
 
-        if patches:
-            for r in self._rendered_datasources:
-                if r.document is not None:
-                    r.document.add_next_tick_callback(lambda ds=r: ds.patch(patches))
+        if self._spill is not None and len(self._spill):
+            # spilled rows are immutable, and not in _data anymore, lets not detect them as new.
+            new_data = new_data[new_data.index > self._spill.index[-1]]
+
+        start = time.perf_counter()
+        patchable = self._patchable(new_data)
+        patches = self._patch(new_data, patchable)
+        self.metrics.patch_time.observe(time.perf_counter() - start)
 
+        start = time.perf_counter()
         streamable = self._stream(new_data)
+        self.metrics.stream_time.observe(time.perf_counter() - start)
+
+        return self._apply(new_data, patches, patchable, streamable, received)
+
+    def update(self, rows: pandas.DataFrame) -> DataModel:
+        """ To apply only some rows, as a delta : known index labels are patched, others are streamed.
+
+        Only these rows are compared with current data, producers do not have to rebuild the full frame.
+        """
+        received = time.perf_counter()
+        if not rows.index.is_unique:
+            raise TypeError(f"{rows.index} has to be unique to be applied as a delta.")
+
+        rows = self._compact(rows)
+
+        if self._spill is not None and len(self._spill):
+            rows = rows[rows.index > self._spill.index[-1]]
+
+        known = self._known(rows.index)
+
+        start = time.perf_counter()
+        patchable = self._patchable(rows[known])
+        patches = self._patch(rows, patchable)
+        self.metrics.patch_time.observe(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        streamable = rows[~known]
+        self.metrics.stream_time.observe(time.perf_counter() - start)
+
+        new_data = self._data
+        if not patchable.empty:
+            new_data = new_data.copy()
+            new_data.loc[patchable.index, patchable.columns] = patchable
+        if not streamable.empty:
+            new_data = pandas.concat([new_data, streamable])
+
+        return self._apply(new_data, patches, patchable, streamable, received)
+
+    async def ingest(
+        self,
+        source: typing.Union[typing.AsyncIterable[pandas.DataFrame], asyncio.Queue],
+        max_rows: int = 1000,
+        max_delay: float = 0.1,
+        until_detached: bool = True,
+    ) -> DataModel:
+        """ To feed this model from row batches, applied as deltas (see update).
+
+        Items are merged until max_rows, or max_delay seconds after the first one, then applied at once.
+        This decouples the producer rate from the update (and render) rate.
+        source can be an asyncio.Queue, where a None item ends the ingestion.
+        An exception raised by source ends the ingestion too, it is raised from here, after the rows before it.
+        With until_detached, the ingestion also ends when the last attached document is gone.
+        """
+        if isinstance(source, asyncio.Queue):
+            queue = source
+            pump = None
+        else:
+            queue = asyncio.Queue(maxsize=max_rows)
+            items = source.__aiter__()
+
+            async def pumping():
+                try:
+                    async for item in items:
+                        await queue.put(item)
+                except asyncio.CancelledError:
+                    pass  # ingestion is over, nobody reads the queue anymore
+                except Exception as e:
+                    await queue.put(e)  # raised by ingest
+                else:
+                    await queue.put(None)
+                finally:
+                    # not waiting for the generator to be collected
+                    if hasattr(items, "aclose"):
+                        await items.aclose()
+
+            # Note : we cannot cancel a pending __anext__ on timeout without closing the iterator,
+            # so a task reads it for us.
+            pump = asyncio.create_task(pumping())
+
+        loop = asyncio.get_running_loop()
+        batch: typing.List[pandas.DataFrame] = list()
+        batch_rows = 0
+        deadline = None
+        was_attached = False
+        try:
+            while True:
+                # also waking up regularly to notice detached documents
+                timeout = (
+                    max_delay if deadline is None else max(0.0, deadline - loop.time())
+                )
+                ended = timed_out = False
+                try:
+                    item = await asyncio.wait_for(queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    timed_out = True
+                else:
+                    if item is None or isinstance(item, Exception):
+                        ended = True
+                    else:
+                        if deadline is None:
+                            deadline = loop.time() + max_delay
+                        batch.append(item)
+                        batch_rows += len(item)
+
+                if batch and (ended or timed_out or batch_rows >= max_rows):
+                    self.update(_merged(batch))
+                    batch, batch_rows, deadline = list(), 0, None
+                if ended and item is not None:
+                    raise item
+
+                attached = self.attached
+                was_attached = was_attached or attached > 0
+                if ended or (until_detached and was_attached and attached == 0):
+                    return self
+        finally:
+            if pump is not None:
+                pump.cancel()
+                await asyncio.gather(pump, return_exceptions=True)
+
+    def feed(self, maxsize: int = 1000) -> ThreadFeed:
+        """ To ingest row batches from other threads, see ThreadFeed. Call it from the event loop. """
+        return ThreadFeed(self, loop=asyncio.get_running_loop(), maxsize=maxsize)
+
+    def _apply(
+        self,
+        new_data: pandas.DataFrame,
+        patches: typing.Dict[str, list],
+        patchable: pandas.DataFrame,
+        streamable: pandas.DataFrame,
+        received: typing.Optional[float] = None,
+    ) -> DataModel:
+        """ To push detected changes to datasources, and replace data. """
+        received = received if received is not None else time.perf_counter()
+        self.metrics.diff_latency.observe(time.perf_counter() - received)
+        self.metrics.updates += 1
+
+        old, received_data = self._data, new_data
+        # Replace data here. It will NOT trigger redraw of the various plots, we rely on stream or patch for that.
+        self._data = new_data = self._spilled(new_data)
+
+        # datasources can follow with patch and stream only if rows are still in the same order :
+        # some appended, and maybe the first ones dropped (rollover, by spill or by the producer).
+        rolled = len(old) + len(streamable) - len(new_data)
+        incremental = (
+            not self._resync
+            and rolled >= 0
+            and new_data.index.equals(old.index[rolled:].append(streamable.index))
+        )
+        self._resync = False
+        if not incremental:
+            # rows may have been inserted anywhere, not only appended (the fast path of _stream) : all new rows.
+            streamable = received_data[~received_data.index.isin(old.index)]
+        self.delta = delta = Delta(
+            stream=streamable,
+            patch=patchable,
+            rolled=rolled if incremental else None,
+            sequence=self.delta.sequence + 1,
+            received=received,
+        )
+        if self._trace == "browser":
+            self._received[delta.sequence] = received
+            self._received.pop(delta.sequence - 1000, None)  # not acked by now, lost
+
+        self._log.append(delta, len(new_data))
+        # changes are kept for the datasources behind only (pulling, or not sent yet)
+        self._log.prune(
+            min(
+                (
+                    self._versions.get(id(r), delta.sequence)
+                    for r in self._rendered_datasources
+                    if r.document is not None
+                ),
+                default=delta.sequence,
+            )
+        )
+        pushed = self._pushed()
 
+        if patches:
+            self.metrics.rows_patched += len(patchable)
         if not streamable.empty:
-            for r in self._rendered_datasources:
-                if r.document is not None:
-                    r.document.add_next_tick_callback(
-                        lambda ds=r: ds.stream(streamable),
+            self.metrics.rows_streamed += len(streamable)
+
+        # what to send to each datasource, computed once for all of them.
+        steps: typing.List[typing.Callable[[ColumnDataSource], None]] = list()
+        sent_bytes = 0
+        if incremental:
+            if patches:
+                # a patch of the whole column is a column replace, sent as binary
+                whole = slice(0, len(old))
+                columns = {
+                    c: p[0][1]
+                    for c, p in patches.items()
+                    if len(p) == 1 and p[0][0] == whole
+                }
+                cells = {c: p for c, p in patches.items() if c not in columns}
+                sent_bytes += sum(
+                    _patch_bytes(
+                        sum(len(v) if isinstance(i, slice) else 1 for i, v in p), len(p)
+                    )
+                    for p in cells.values()
+                ) + sum(v.nbytes for v in columns.values())
+                # Note : patches are applied before the stream, on the previous rows.
+                if cells:
+                    steps.append(lambda ds: ds.patch(cells))
+                if columns:
+                    steps.append(lambda ds: ds.data.update(columns))
+
+            if not streamable.empty and pushed:
+                sent_bytes += int(streamable.memory_usage().sum())
+                stream_data = self._source_data(streamable)
+                steps.append(
+                    lambda ds: ds.stream(
+                        stream_data, rollover=len(new_data) if rolled else None
                     )
+                )
 
-        # Replace data here and in existing datasources.
-        # BUT it will NOT trigger redraw of the various plots, we rely on stream or patch for that.
-        self._data = new_data
+            self._positions.streamed(streamable.index, start=len(old))
+            self._positions.rolled(old.index[:rolled])
+        else:
+            # rows removed or reordered : datasources data is replaced (heavy, but rare).
+            self._positions.reset()
+            sent_bytes += int(new_data.memory_usage().sum())
+            steps.append(lambda ds: setattr(ds, "data", self._snapshot()))
+
+        if steps:
+            for r in pushed:
+                if id(r) in self._sending:
+                    # the previous update is not sent yet : it will send both at once (see _send).
+                    self.metrics.coalesced += 1
+                    continue
+                self._sending.add(id(r))
+                self.metrics.queued(r.document, sent_bytes)
+                self._schedule(
+                    r.document, functools.partial(self._send, r, steps, delta), received
+                )
 
         # We also do the same for related models
         for code, runnable in self._related_models.items():
             print(f"propagating update for {code}")
+            start = time.perf_counter()
             runnable()  # already contains domain and codomain - with new data-, here we just press the trigger.
+            self.metrics.derived_time.observe(time.perf_counter() - start)
 
-        # Note this is necessary for further patches to work correctly and not get out of bounds.
-        for rds in self._rendered_datasources:
-            if rds.document is not None:
-                rds.document.add_next_tick_callback(
-                    lambda ds=rds: setattr(ds, "data", new_data)
-                )
+        for callback in self._update_callbacks:
+            callback(self)
 
         return self  # to be able to chain updates.
 
 
+class ThreadFeed:
+    """ Hands row batches from any thread to a DataModel, on its event loop.
+
+    DataModel (and bokeh documents) must only be modified from the loop, NOT from the producer threads.
+    Batches wait in a bounded queue : when the loop lags behind, put() blocks the producer, not the loop.
+    All batches waiting are merged and applied with one update (see DataModel.update).
+    """
+
+    def __init__(
+        self, model: DataModel, loop: asyncio.AbstractEventLoop, maxsize: int = 1000,
+    ):
+        self.model = model
+        self.loop = loop
+        self._queue: queue.Queue = queue.Queue(maxsize=maxsize)
+        self._draining = threading.Event()  # a drain is already scheduled on the loop
+
+    def put(
+        self,
+        rows: pandas.DataFrame,
+        block: bool = True,
+        timeout: typing.Optional[float] = None,
+    ) -> None:
+        """ From any thread. Raises queue.Full if not block, or after timeout. """
+        self._queue.put(rows, block=block, timeout=timeout)
+        if not self._draining.is_set():
+            # Note : two threads might both schedule a drain, the second one finds nothing to do.
+            self._draining.set()
+            self.loop.call_soon_threadsafe(self._drain)
+
+    def _drain(self) -> None:
+        # cleared first : rows put from now on will schedule another drain.
+        self._draining.clear()
+        batch = list()
+        while True:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        if batch:
+            self.model.update(_merged(batch))
+
+
 async def _internal_example():  # async because we need to schedule tasks in background...
     # Minimal server test
     import random
@@ -299,6 +1129,7 @@ async def _internal_example():  # async because we need to schedule tasks in bac
     # Producer as a background task
     async def compute_random(m, M):
         tick = ddmodel1.data.index.to_list()  # to help with full data generation
+        rng = numpy.random.default_rng()
         while True:
             now = datetime.now()
             tick.append(now)
@@ -309,36 +1140,44 @@ async def _internal_example():  # async because we need to schedule tasks in bac
             ddmodel1(
                 pandas.DataFrame(
                     columns=["random1"],
-                    data={"random1": [random.randint(m, M) for t in range(len(tick))]},
+                    data={"random1": rng.integers(m, M, len(tick), endpoint=True)},
                     index=tick,
                 )
             )
 
-            # Note : we can trigger only a stream update by calling with the same data + some appended...
-            ddmodel2(
-                ddmodel2.data.append(
-                    pandas.DataFrame(
-                        data={"random2": [random.randint(m, M)]}, index=[now]
-                    )
-                )
-            )
-
             await asyncio.sleep(1)
 
+    # Note : we can also only produce the new rows, and let the model ingest them as stream updates.
+    from livebokeh.simulation import Paths, uniform_integers
+
+    random_rows = Paths(uniform_integers(-10, 10), columns=["random2"])
+
     # scheduling bg async task... will start with the server (not the client request)
     asyncio.get_running_loop().create_task(compute_random(-10, 10))
+    # keeps running without documents, like compute_random.
+    asyncio.get_running_loop().create_task(
+        ddmodel2.ingest(random_rows, until_detached=False)
+    )
+
+    # each ddsource2 row, with the last ddsource1 value at that time. updated with the rows touched only.
+    joined = ddmodel2.join(ddmodel1, how="asof")
 
     # we return the functions here so they are usable by the main code.
     # Note : the separation of these function is important to illustrate the different calls (startup /vs/ client request)
-    return ddmodel1, ddmodel2
+    return ddmodel1, ddmodel2, joined
 
 
 def _internal_bokeh(doc, example=None):
+    from bokeh.layouts import layout
+    from bokeh.models import PreText
+    from bokeh.plotting import Figure
+
     moduleview = inspect.getsource(sys.modules[__name__])
 
     # Note: if launched by package, the result of _internal_example is passed via kwargs
     ddmodel1 = example[0]
     ddmodel2 = example[1]
+    joined = example[2]
 
     # Debug Bokeh Figure
     debug_fig = Figure(
@@ -377,6 +1216,7 @@ def _internal_bokeh(doc, example=None):
                         debug_fig,
                         ddmodel1.view.table,
                         ddmodel2.view.table,
+                        joined.view.table,
                     ],
                 ]
             ],
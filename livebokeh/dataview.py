@@ -4,21 +4,24 @@ import inspect
 import sys
 import typing
 
-import bokeh
+import numpy
 import pandas
-from bokeh.layouts import column, layout, row
+from bokeh.layouts import layout
 from bokeh.models import (
     BooleanFilter,
     CDSView,
+    ColumnDataSource,
     DataTable,
     DateFormatter,
     PreText,
     TableColumn,
 )
 from bokeh.palettes import viridis
+from bokeh.plotting import Figure
 
+# Note : this is the rendering layer, it does need bokeh.
+# DataModel.view imports it on first use only.
 from livebokeh.datamodel import DataModel
-from bokeh.plotting import Figure
 
 
 class DataView:  # rename ? "LiveFrameView"
@@ -62,6 +65,8 @@ class DataView:  # rename ? "LiveFrameView"
             "index_position": None,
         }
         self._plot_args = dict()
+        # max number of rows of cold history to display at once (see DataModel spill)
+        self.history_rows = 2000
 
     def bokeh_view(self, ignore_filters=False):
         """ because we need a new view for each document request...
@@ -124,8 +129,41 @@ class DataView:  # rename ? "LiveFrameView"
                 legend_label=c,
             )
 
+        if self.model._spill is not None:
+            self._plot_history(figure, color_index)
+
         return figure
 
+    def _plot_history(self, figure: Figure, color_index: typing.Dict[str, str]):
+        """ Cold history is only loaded from disk for the visible range, when zooming out of the hot data. """
+        history = ColumnDataSource(
+            data=DataModel._source_data(self.model.data.iloc[:0])
+        )
+        for c in self.model.data.columns:
+            figure.line(
+                source=history, x="index", y=c, color=color_index[c], legend_label=c,
+            )
+
+        def load_visible(attr, old, new):
+            start, end = figure.x_range.start, figure.x_range.end
+            if start is None or end is None or self.model.data.empty:
+                return
+            hot_start = self.model.data.index[0]
+            if pandas.api.types.is_datetime64_any_dtype(self.model.data.index):
+                # datetime axis ranges are in milliseconds since epoch
+                start = pandas.Timestamp(start, unit="ms")
+                end = pandas.Timestamp(end, unit="ms")
+            if start >= hot_start:  # nothing cold is visible
+                history.data = DataModel._source_data(self.model.data.iloc[:0])
+            else:
+                visible = self.model.history(
+                    start, min(end, hot_start), max_rows=self.history_rows
+                )
+                history.data = DataModel._source_data(visible)
+
+        figure.x_range.on_change("start", load_visible)
+        figure.x_range.on_change("end", load_visible)
+
     # TODO : more plots
 
 
@@ -176,16 +214,15 @@ async def _internal_example():
         tick = (
             random_data_model.data.index.to_list()
         )  # to help with full data generation
+        rng = numpy.random.default_rng()
         while True:
             now = datetime.now()
             tick.append(now)
             print(now)  # print in console for explicitness
 
             new_data = {
-                "random1": [
-                    random.randint(m, M)  # change everything to trigger patch
-                    for t in range(len(tick))  # + 1 extra element to stream
-                ],
+                # change everything to trigger patch, + 1 extra element to stream
+                "random1": rng.integers(m, M, len(tick), endpoint=True),
                 "random2": random_data_model.data["random2"].to_list()
                 + [random.randint(m, M)],  # only add one element to stream
             }
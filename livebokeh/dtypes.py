@@ -0,0 +1,126 @@
+"""
+Compact dtypes for DataModels, to shrink server memory and websocket payloads.
+"""
+from __future__ import annotations
+
+import typing
+
+import numpy
+import pandas
+from pandas.api import types
+
+
+def epoch_ms(values) -> numpy.ndarray:
+    """ datetimes as float milliseconds since epoch, like BokehJS wants them. NaT becomes NaN. """
+    values = pandas.DatetimeIndex(values)
+    if values.tz is not None:
+        values = values.tz_convert(None)  # UTC
+    ms = values.asi8 / 1e6
+    ms[values.isna()] = numpy.nan
+    return ms
+
+
+class DtypePolicy:
+    """ Opt-in dtypes conversion, applied to data entering a DataModel.
+
+    - floats are stored as `floats` (float32 by default)
+    - integers as `integers` (int32 by default), or the smallest wider integer dtype their values fit in.
+    - strings columns are categoricals, if there are at most category_ratio unique values per row.
+    - datetimes (columns and index) are float epoch milliseconds.
+    None disables a conversion.
+    Once a model has data, later rows are converted to the same dtypes,
+    or wider integers if they do not fit anymore (see extend).
+    """
+
+    def __init__(
+        self,
+        floats: typing.Optional[str] = "float32",
+        integers: typing.Optional[str] = "int32",
+        category_ratio: typing.Optional[float] = 0.5,
+        datetimes: bool = True,
+    ):
+        self.floats = numpy.dtype(floats) if floats is not None else None
+        self.integers = numpy.dtype(integers) if integers is not None else None
+        self.category_ratio = category_ratio
+        self.datetimes = datetimes
+
+    def _column(
+        self, col: pandas.Series, like: typing.Optional[pandas.Series] = None
+    ) -> pandas.Series:
+        if self.datetimes and types.is_datetime64_any_dtype(col.dtype):
+            return pandas.Series(epoch_ms(col), index=col.index, name=col.name)
+
+        if like is not None and types.is_categorical_dtype(like.dtype):
+            # new categories are appended, to not recode existing data.
+            new = pandas.Index(col.dropna().unique()).difference(like.cat.categories)
+            return col.astype(pandas.CategoricalDtype(like.cat.categories.append(new)))
+
+        if self.floats is not None and types.is_float_dtype(col.dtype):
+            return col.astype(self.floats)
+
+        if self.integers is not None and types.is_integer_dtype(col.dtype):
+            fitted = pandas.to_numeric(col, downcast="integer").dtype
+            if fitted.kind != "i":  # above the int64 range, kept as is
+                return col
+            dtype = self.integers
+            if like is not None and types.is_integer_dtype(like.dtype):
+                dtype = like.dtype
+            return col.astype(numpy.promote_types(dtype, fitted))
+
+        if (
+            self.category_ratio is not None
+            and like is None  # decided on the first data only
+            and col.dtype == object
+            and len(col)
+            and col.map(type).eq(str).all()
+            and col.nunique() <= self.category_ratio * len(col)
+        ):
+            return col.astype("category")
+
+        return col
+
+    def __call__(
+        self, data: pandas.DataFrame, like: typing.Optional[pandas.DataFrame] = None
+    ) -> pandas.DataFrame:
+        """ data with compact dtypes. like is the current model data, whose dtypes are kept. """
+        data = pandas.DataFrame(
+            {
+                c: self._column(
+                    data[c], like[c] if like is not None and c in like else None
+                )
+                for c in data.columns
+            },
+            index=data.index,
+            columns=data.columns,
+        )
+        if self.datetimes and isinstance(data.index, pandas.DatetimeIndex):
+            data.index = pandas.Index(epoch_ms(data.index), name=data.index.name)
+        return data
+
+    @staticmethod
+    def extend(data: pandas.DataFrame, rows: pandas.DataFrame) -> pandas.DataFrame:
+        """ data with the categories and the wider integers of rows, to be able to concatenate them. """
+        extended = {
+            c: rows[c].dtype
+            for c in data.columns
+            if c in rows
+            and types.is_categorical_dtype(data[c].dtype)
+            and types.is_categorical_dtype(rows[c].dtype)
+            and len(rows[c].cat.categories) > len(data[c].cat.categories)
+        }
+        extended.update(DtypePolicy.widened(data, rows))
+        return data.astype(extended) if extended else data
+
+    @staticmethod
+    def widened(
+        data: pandas.DataFrame, rows: pandas.DataFrame
+    ) -> typing.Dict[str, numpy.dtype]:
+        """ integer columns of data whose values of rows do not fit in, with the dtype they need. """
+        return {
+            c: rows[c].dtype
+            for c in data.columns
+            if c in rows
+            and types.is_integer_dtype(data[c].dtype)
+            and types.is_integer_dtype(rows[c].dtype)
+            and rows[c].dtype.itemsize > data[c].dtype.itemsize
+        }
@@ -0,0 +1,169 @@
+"""
+Metrics of the update pipeline, to know which model is eating the loop.
+"""
+from __future__ import annotations
+
+import inspect
+import math
+import sys
+import typing
+
+import pandas
+
+
+class Histogram:
+    """ A cheap histogram, with power of 2 buckets, suitable to observe every update. """
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        self.buckets: typing.Dict[int, int] = dict()  # exponent -> count
+
+    def observe(self, value: float) -> None:
+        self.count += 1
+        self.total += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        # bucket e contains values in ]2**(e-1), 2**e]
+        bucket = math.ceil(math.log2(value)) if value > 0 else -sys.maxsize
+        self.buckets[bucket] = self.buckets.get(bucket, 0) + 1
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else math.nan
+
+    def quantile(self, q: float) -> float:
+        """ upper bound of the bucket containing the q-quantile """
+        if not self.count:
+            return math.nan
+        seen = 0
+        for b in sorted(self.buckets):
+            seen += self.buckets[b]
+            if seen >= q * self.count:
+                return min(2.0 ** b, self.max) if b != -sys.maxsize else 0.0
+        return self.max
+
+    def __repr__(self):
+        return f"Histogram(count={self.count}, mean={self.mean}, max={self.max})"
+
+
+class ModelMetrics:
+    """ Counters and histograms for one DataModel. Times are in seconds. """
+
+    def __init__(self):
+        self.patch_time = Histogram()  # diff time in _patch
+        self.stream_time = Histogram()  # diff time in _stream
+        self.derived_time = Histogram()  # recompute time of related models
+        # latencies since an update entered the model (see DataModel trace)
+        self.diff_latency = Histogram()  # diff done
+        self.callback_latency = Histogram()  # next tick callbacks run
+        self.written_latency = Histogram()  # written to the session websocket
+        self.browser_latency = Histogram()  # applied by the browser, acked back
+        self.updates = 0
+        self.rows_streamed = 0
+        self.rows_patched = 0
+        # per document id, pruned when its datasources are detached
+        self.bytes_queued: typing.Dict[int, int] = dict()
+        self.pending_callbacks = 0  # next tick callbacks not run yet
+        self.coalesced = (
+            0  # updates sent with the next one, to a datasource lagging behind
+        )
+        self.resyncs = 0  # full data sent to a datasource behind the change log
+
+    def queued(self, document, nbytes: int) -> None:
+        self.bytes_queued[id(document)] = (
+            self.bytes_queued.get(id(document), 0) + nbytes
+        )
+
+    def as_dict(self) -> typing.Dict[str, typing.Any]:
+        flat = dict()
+        for n, v in vars(self).items():
+            if isinstance(
+                v, dict
+            ):  # per document : the total, and the document with the most
+                flat[n] = sum(v.values())
+                flat[f"{n}_max"] = max(v.values(), default=0)
+            elif isinstance(v, Histogram):
+                flat[f"{n}_count"] = v.count
+                flat[f"{n}_mean_ms"] = v.mean * 1000
+                flat[f"{n}_p90_ms"] = v.quantile(0.9) * 1000
+                flat[f"{n}_max_ms"] = v.max * 1000 if v.count else math.nan
+            else:
+                flat[n] = v
+        return flat
+
+
+def metrics() -> typing.Dict[int, typing.Dict[str, typing.Any]]:
+    """ Metrics of all live models, indexed by model id. bytes_queued_per_document is indexed by document id. """
+    from livebokeh.datamodel import DataModel
+
+    return {
+        id(m): {
+            "name": m._name,
+            "datasources": m.attached,
+            **m.metrics.as_dict(),
+            "bytes_queued_per_document": dict(m.metrics.bytes_queued),
+        }
+        for m in DataModel.instances()
+    }
+
+
+def metrics_frame() -> pandas.DataFrame:
+    """ one row per model, with the totals only. """
+    frame = pandas.DataFrame.from_dict(metrics(), orient="index").sort_index()
+    return frame.drop(columns="bytes_queued_per_document", errors="ignore")
+
+
+async def _internal_example():
+    # livebokeh on itself : the metrics of all models are also a model.
+    import asyncio
+    from livebokeh.datamodel import DataModel
+
+    metrics_model = DataModel(name="metrics", data=metrics_frame(), debug=False)
+
+    async def refresh(period_secs: float):
+        while True:
+            await asyncio.sleep(period_secs)
+            metrics_model(metrics_frame())
+
+    asyncio.get_running_loop().create_task(refresh(period_secs=1))
+
+    return metrics_model
+
+
+def _internal_bokeh(doc, example=None):
+    from bokeh.layouts import layout
+    from bokeh.models import PreText
+
+    metrics_model = example
+
+    doc.add_root(
+        layout(
+            [
+                [PreText(text=inspect.getsource(sys.modules[__name__]))],
+                [metrics_model.view.table],
+            ]
+        )
+    )
+
+
+if __name__ == "__main__":
+    import asyncio
+
+    async def main():
+        import functools
+        from livebokeh import datamodel
+        from livebokeh.monosrv import monosrv
+
+        # some models to measure
+        await datamodel._internal_example()
+        example = await _internal_example()
+
+        await monosrv({"/": functools.partial(_internal_bokeh, example=example)})
+
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        print("Exiting...")
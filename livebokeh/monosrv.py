@@ -1,33 +1,218 @@
 """
 A minimalist async server for visualization
 """
+from __future__ import annotations
+
 import asyncio
+import functools
+import importlib
 import sys
 import typing
 
+from bokeh.application import Application
+from bokeh.application.handlers import FunctionHandler, Handler
 from bokeh.document import Document
 from bokeh.layouts import column, layout
-from bokeh.models import PreText
+from bokeh.models import ColumnDataSource, PreText
 from bokeh.server.server import Server as BokehServer
+from tornado.web import RequestHandler
+
+from livebokeh.datamodel import DataModel
+from livebokeh.profiler import SamplingProfiler
+
+
+def _detach_sources(session_context, sources: typing.List[ColumnDataSource]) -> None:
+    """ Datasources of a destroyed session should not be updated anymore. """
+    for m in DataModel.instances():
+        m.detach(sources)
+
+
+class _SessionLifecycle(Handler):
+    """ Hooks session destruction into a document, after the application handlers built it. """
+
+    def __init__(
+        self,
+        on_session_destroyed: typing.Iterable[typing.Callable[[typing.Any], None]] = (),
+    ):
+        super().__init__()
+        self._hooks = list(on_session_destroyed)
+
+    def modify_document(self, doc: Document):
+        # we can only know which datasources this document renders after the application built it.
+        # Note : when the destroy hooks run, bokeh has already unset each model document...
+        sources = list(doc.select({"type": ColumnDataSource}))
+        doc.on_session_destroyed(functools.partial(_detach_sources, sources=sources))
+        for hook in self._hooks:
+            doc.on_session_destroyed(hook)
+        return doc
+
+
+class LazyModule(Handler):
+    """ A livebokeh module, imported and with its example started on the first session only.
+
+    The module may provide async _internal_example() and must provide _internal_bokeh(doc, example).
+    With stop_when_unused, tasks started by the example are cancelled when the last session is destroyed,
+    and the example is started again for the next session.
+    on_started is called with this handler, after the example started, before its tasks run.
+    on_stopped is called with this handler, after its tasks are cancelled, before its models are dropped.
+    """
+
+    def __init__(
+        self,
+        module_name: str,
+        stop_when_unused: bool = False,
+        on_started: typing.Optional[typing.Callable[[LazyModule], None]] = None,
+        on_stopped: typing.Optional[typing.Callable[[LazyModule], None]] = None,
+    ):
+        super().__init__()
+        self.module_name = module_name
+        self.stop_when_unused = stop_when_unused
+        self.on_started = on_started
+        self.on_stopped = on_stopped
+        self._module = None
+        self._example = None
+        self._started = False
+        self._tasks: typing.Set[asyncio.Task] = set()
+        # the models created by the example
+        self.models: typing.List[DataModel] = list()
+        self._sessions = 0
+        self._lock: typing.Optional[asyncio.Lock] = None
+
+    @property
+    def started(self) -> bool:
+        return self._started
+
+    async def on_session_created(self, session_context):
+        self._sessions += 1
+        if self._lock is None:  # created in the running loop
+            self._lock = asyncio.Lock()
+        async with self._lock:  # in case sessions are created concurrently
+            if not self._started:
+                await self._start()
+
+    async def _start(self):
+        print(f"Starting {self.module_name}...")
+        # Note : tasks started concurrently by other code will also be attributed to this module.
+        before = asyncio.all_tasks()
+        models_before = set(DataModel.instances())
+        self._module = importlib.import_module(self.module_name)
+        self._example = (
+            await self._module._internal_example()
+            if hasattr(self._module, "_internal_example")
+            else None
+        )
+        self._tasks = asyncio.all_tasks() - before
+        self.models = [m for m in DataModel.instances() if m not in models_before]
+        self._started = True
+        if self.on_started is not None:
+            self.on_started(self)
+
+    def modify_document(self, doc: Document):
+        self._module._internal_bokeh(doc, example=self._example)
+        return doc
+
+    async def on_session_destroyed(self, session_context):
+        self._sessions -= 1
+        if self._sessions == 0 and self.stop_when_unused and self._started:
+            print(f"Stopping {self.module_name}...")
+            for t in self._tasks:
+                t.cancel()
+            self._tasks = set()
+            if self.on_stopped is not None:
+                self.on_stopped(self)
+            self._example = None
+            self.models = list()
+            self._started = False
+
+
+class ProfileHandler(RequestHandler):
+    """ Text view of a SamplingProfiler : a summary, or the folded stacks with ?folded (for a flamegraph).
+
+    ?run=1 or ?run=0 starts or stops sampling, ?reset clears the samples, at runtime.
+    """
+
+    def initialize(self, profiler: SamplingProfiler):
+        self.profiler = profiler
+
+    def get(self):
+        run = self.get_argument("run", None)
+        if run is not None:
+            if run == "0":
+                self.profiler.stop()
+            else:
+                self.profiler.start()
+        if self.get_argument("reset", None) is not None:
+            self.profiler.reset()
+
+        self.set_header("Content-Type", "text/plain; charset=utf-8")
+        if self.get_argument("folded", None) is not None:
+            self.write(self.profiler.folded())
+        else:
+            self.write(self.profiler.summary())
 
 
 async def monosrv(
-    applications: typing.Dict[str, typing.Callable[[Document], typing.Any]]
+    applications: typing.Dict[
+        str, typing.Union[typing.Callable[[Document], typing.Any], Handler]
+    ],
+    duration: typing.Optional[float] = None,
+    unused_session_lifetime_milliseconds: int = 15000,
+    check_unused_sessions_milliseconds: int = 17000,
+    on_session_destroyed: typing.Iterable[typing.Callable[[typing.Any], None]] = (),
+    profiler: typing.Optional[SamplingProfiler] = None,
+    **server_kwargs,
 ):
-    """ Async server runner, to force the eventloop -same as the server loop- to be already running..."""
+    """ Async server runner, to force the eventloop -same as the server loop- to be already running...
+
+    duration is in seconds, None means running until cancelled (KeyboardInterrupt with asyncio.run).
+    Sessions without connection (closed or discarded browser tab) are destroyed after
+    unused_session_lifetime_milliseconds, and the datamodels stop updating their datasources.
+    on_session_destroyed are extra hooks, called with the bokeh session_context.
+    An application can also be a bokeh Handler, like LazyModule.
+    With a profiler, its samples are served on /profile (see ProfileHandler). It is not started here.
+    Other keyword arguments are passed to bokeh's server (port, extra_patterns, etc.)
+    """
+    if profiler is not None:
+        server_kwargs["extra_patterns"] = list(
+            server_kwargs.get("extra_patterns", [])
+        ) + [("/profile", ProfileHandler, {"profiler": profiler})]
+
     print(f"Starting Tornado Server...")
     # Server will take current running asyncio loop as his own.
-    server = BokehServer(applications=applications, io_loop=None, num_procs=1)
+    server = BokehServer(
+        applications={
+            route: Application(
+                app if isinstance(app, Handler) else FunctionHandler(app),
+                _SessionLifecycle(on_session_destroyed=on_session_destroyed),
+            )
+            for route, app in applications.items()
+        },
+        io_loop=None,
+        num_procs=1,
+        unused_session_lifetime_milliseconds=unused_session_lifetime_milliseconds,
+        check_unused_sessions_milliseconds=check_unused_sessions_milliseconds,
+        **server_kwargs,
+    )
     # ioloop must remain to none, num_procs must be default (1)
     # TODO : maybe better to explicitely set io_loop to current loop here...
 
     server.start()
     # TODO : how to handle exceptions here ??
     #  we would like to except, trigger some user-defined behavior and restart what needs to be.
-    print("Serving Bokeh application on http://localhost:5006/")
+    print(f"Serving Bokeh application on http://localhost:{server.port}/")
 
-    await asyncio.sleep(3600)  # running for one hour.
-    # TODO : scheduling restart (crontab ? cli params ?) -> GOAL: ensure resilience (erlang-style)
+    try:
+        if duration is None:
+            await asyncio.Event().wait()  # running until cancelled
+        else:
+            await asyncio.sleep(duration)
+        # TODO : scheduling restart (crontab ? cli params ?) -> GOAL: ensure resilience (erlang-style)
+    finally:
+        # graceful shutdown : sessions callbacks are removed, and listening sockets closed.
+        print("Stopping Tornado Server...")
+        server.stop()
+        if profiler is not None:
+            profiler.stop()
 
 
 def _internal_bokeh(doc, example=None):
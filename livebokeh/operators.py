@@ -0,0 +1,630 @@
+"""
+Incremental operators between DataModels : derived models only recompute the rows touched by the last delta.
+
+They are related models (see DataModel._related_models), triggered after each update of their input.
+"""
+from __future__ import annotations
+
+import functools
+import typing
+
+import numpy
+import pandas
+
+from livebokeh.datamodel import DataModel
+
+
+def _asof(right: DataModel, labels: pandas.Index) -> pandas.DataFrame:
+    """ for each label, the last right row at or before it. """
+    rindex = right.data.index
+    positions = rindex.searchsorted(labels, side="right") - 1
+    rows = right.data.iloc[positions.clip(min=0)].set_axis(labels, axis="index")
+    return rows.where(pandas.Series(positions >= 0, index=labels), axis="index")
+
+
+def _asof_affected(left: DataModel, right: DataModel) -> pandas.Index:
+    """ left labels matching the right rows touched by its last delta. """
+    touched = right.delta.stream.index.append(right.delta.patch.index)
+    rindex, lindex = right.data.index, left.data.index
+    if not len(touched) or not len(lindex):
+        return lindex[:0]
+    # each right row is matched by left rows from its label to the next right label.
+    nexts = rindex.searchsorted(touched, side="right")
+    starts = lindex.searchsorted(touched, side="left")
+    stops = numpy.where(
+        nexts < len(rindex),
+        lindex.searchsorted(rindex[nexts.clip(max=len(rindex) - 1)], side="left"),
+        len(lindex),
+    )
+    positions = numpy.unique(
+        numpy.concatenate([numpy.arange(a, b) for a, b in zip(starts, stops)])
+    )
+    return lindex[positions.astype(int)]
+
+
+def _joined(
+    left: DataModel,
+    right: DataModel,
+    labels: pandas.Index,
+    how: str,
+    lsuffix: str,
+    rsuffix: str,
+) -> pandas.DataFrame:
+    rrows = _asof(right, labels) if how == "asof" else right._rows(labels)
+    return left._rows(labels).join(rrows, lsuffix=lsuffix, rsuffix=rsuffix)
+
+
+def join(
+    left: DataModel,
+    right: DataModel,
+    how: str = "outer",
+    lsuffix: str = "",
+    rsuffix: str = "",
+) -> DataModel:
+    """ A model joining left and right on their index, like DataFrame.join.
+
+    how is "outer", or "asof" : each left row with the last right row at or before it (sorted indexes only).
+    Only the rows touched by the last update of either side are joined again.
+    Note : rows removed from an input are not removed from the join.
+    """
+    if how not in ("outer", "asof"):
+        raise TypeError(f"{how} join is not supported, only outer or asof.")
+    if lsuffix == rsuffix and len(left.columns.intersection(right.columns)):
+        raise TypeError(
+            f"{left.columns.intersection(right.columns)} in both models, use suffixes."
+        )
+    if how == "asof" and not (
+        left.data.index.is_monotonic_increasing
+        and right.data.index.is_monotonic_increasing
+    ):
+        raise TypeError("asof join requires sorted indexes.")
+
+    key = ("join", how, lsuffix, rsuffix, id(right))
+    # not run again, as the other operators : the last delta is already joined
+    if key in left._related_models:
+        return left._related_models[key].keywords["model_out"]
+
+    def joining(updated: DataModel, model_out: DataModel):
+        if how == "asof" and updated is right:
+            labels = _asof_affected(left, right)
+        else:
+            labels = updated.delta.stream.index.append(updated.delta.patch.index)
+            if how == "asof":  # only left rows exist in the result
+                labels = labels[left._known(labels)]
+        if len(labels):
+            model_out.update(_joined(left, right, labels, how, lsuffix, rsuffix))
+        return model_out
+
+    labels = (
+        left.data.index if how == "asof" else left.data.index.union(right.data.index)
+    )
+    model_out = DataModel(
+        data=_joined(left, right, labels, how, lsuffix, rsuffix),
+        name=f"{left._name} {how} join {right._name}",
+        debug=left._debug,
+    )
+    # the relation is stored on both sides, both trigger it.
+    left._related_models[key] = functools.partial(
+        joining, updated=left, model_out=model_out
+    )
+    right._related_models[
+        ("join", how, lsuffix, rsuffix, id(left), "right")
+    ] = functools.partial(joining, updated=right, model_out=model_out)
+    return model_out
+
+
+def _follow(model_out: DataModel, rows: pandas.DataFrame, rolled: int):
+    """ applies rows as a delta, dropping the same first rows as the input model (row by row operators). """
+    if rolled:
+        kept = model_out.data.iloc[rolled:].copy()
+        known = rows.index.isin(kept.index)
+        kept.loc[rows.index[known]] = rows[known]
+        model_out(pandas.concat([kept, rows[~known]]))
+    elif len(rows):
+        model_out.update(rows)
+
+
+AGGS = ("count", "sum", "mean", "std", "min", "max")
+
+
+def _stats(count, total, squares, agg: str) -> numpy.ndarray:
+    """ aggregate from running count, sum and sum of squares. """
+    with numpy.errstate(invalid="ignore", divide="ignore"):
+        if agg == "count":
+            return count.astype(float)
+        if agg == "sum":
+            return total
+        if agg == "mean":
+            return total / count
+        # std, with one degree of freedom as pandas. Note : numerically weaker than pandas' algorithm.
+        var = (squares - total * total / count) / (count - 1)
+        return numpy.sqrt(var.clip(min=0))
+
+
+class _Rolling:
+    """ Running state of a rolling window : cumulated count, sum and sum of squares, up to each row.
+
+    The aggregate of a window is the difference of two cumulated rows, O(1) for each row.
+    min and max are computed on the window rows instead.
+    """
+
+    def __init__(self, model: DataModel, window: typing.Union[int, str], agg: str):
+        self.model = model
+        self.agg = agg
+        self.window = window if isinstance(window, int) else pandas.Timedelta(window)
+        self.columns = model.data.select_dtypes("number").columns
+        self._reset()
+
+    def _values(self, rows: pandas.DataFrame) -> numpy.ndarray:
+        return rows[self.columns].to_numpy(dtype=float)
+
+    def _reset(self):
+        values = self._values(self.model.data)
+        # cumulated before the first row : not zero anymore after a rollover
+        self._base = numpy.zeros((3, len(self.columns)))
+        # cumulated rows are _buffer[:, _first:_first + _rows], with room to append streamed rows.
+        self._buffer = self._cumulated(values, self._base)
+        self._first, self._rows = 0, len(values)
+
+    @property
+    def _cum(self) -> numpy.ndarray:
+        return self._buffer[:, self._first : self._first + self._rows, :]
+
+    def _append(self, cum: numpy.ndarray):
+        end = self._first + self._rows
+        if end + cum.shape[1] > self._buffer.shape[1]:
+            # moved to a buffer twice as large : amortized O(1) per row.
+            buffer = numpy.empty(
+                (3, max(2 * (self._rows + cum.shape[1]), 1024), len(self.columns))
+            )
+            buffer[:, : self._rows, :] = self._cum
+            self._buffer, self._first, end = buffer, 0, self._rows
+        self._buffer[:, end : end + cum.shape[1], :] = cum
+        self._rows += cum.shape[1]
+
+    @staticmethod
+    def _cumulated(values: numpy.ndarray, base: numpy.ndarray) -> numpy.ndarray:
+        """ shape (3, rows, columns) : count, sum, squares. """
+        valid = ~numpy.isnan(values)
+        clean = numpy.where(valid, values, 0.0)
+        return base[:, None, :] + numpy.stack(
+            [valid.cumsum(axis=0), clean.cumsum(axis=0), (clean * clean).cumsum(axis=0)]
+        )
+
+    def _starts(self, positions: numpy.ndarray) -> numpy.ndarray:
+        """ first row of the window ending at each position. """
+        if isinstance(self.window, int):
+            return (positions - self.window + 1).clip(min=0)
+        index = self.model.data.index
+        return index.searchsorted(index[positions] - self.window, side="right")
+
+    def _min_periods(self) -> int:
+        # as pandas : full windows for a number of rows, one row for a time window, none to count.
+        if self.agg == "count":
+            return 0
+        return self.window if isinstance(self.window, int) else 1
+
+    def rows(self, positions: numpy.ndarray) -> pandas.DataFrame:
+        """ window aggregates ending at positions. """
+        data = self.model.data
+        starts = self._starts(positions)
+        count, total, squares = self._window(starts, positions)
+        if self.agg in ("min", "max"):
+            result = self._extremum(starts, positions)
+        else:
+            result = _stats(count, total, squares, self.agg)
+        result = numpy.where(count >= self._min_periods(), result, numpy.nan)
+        return pandas.DataFrame(
+            result, index=data.index[positions], columns=self.columns
+        )
+
+    def _extremum(
+        self, starts: numpy.ndarray, positions: numpy.ndarray
+    ) -> numpy.ndarray:
+        """ min or max, on the rows of each window. """
+        result = numpy.full((len(positions), len(self.columns)), numpy.nan)
+        if not len(positions):
+            return result
+        offset = starts.min()
+        values = self._values(self.model.data.iloc[offset : positions.max() + 1])
+        reduce = numpy.fmin.reduce if self.agg == "min" else numpy.fmax.reduce
+        for i, (start, stop) in enumerate(zip(starts - offset, positions - offset + 1)):
+            if stop > start:
+                result[i] = reduce(values[start:stop], axis=0)
+        return result
+
+    def _window(self, starts, positions) -> numpy.ndarray:
+        cum = self._cum
+        before = numpy.where(
+            (starts > 0)[None, :, None],
+            cum[:, (starts - 1).clip(min=0), :],
+            self._base[:, None, :],
+        )
+        return cum[:, positions, :] - before
+
+    def updated(self) -> typing.Tuple[typing.Optional[numpy.ndarray], int]:
+        """ follows the model last update.
+
+        returns the positions to compute again (None for all), and the number of first rows dropped.
+        """
+        data, delta = self.model.data, self.model.delta
+        if delta.rolled is None:  # rows removed or reordered
+            self._reset()
+            return None, 0
+
+        if delta.rolled:
+            self._base = self._cum[:, delta.rolled - 1, :].copy()
+            self._first += delta.rolled
+            self._rows -= delta.rolled
+        kept = self._rows
+
+        touched = list()
+        patched = self.model._positions.locate(data.index, delta.patch.index)
+        if len(patched):
+            # cumulated again from the first patched row
+            first = patched.min()
+            before = self._cum[:, first - 1, :] if first > 0 else self._base
+            self._cum[:, first:, :] = self._cumulated(
+                self._values(data.iloc[first:kept]), before
+            )
+            # windows including a patched row
+            if isinstance(self.window, int):
+                last = min(patched.max() + self.window, len(data))
+            else:
+                last = data.index.searchsorted(
+                    data.index[patched.max()] + self.window, side="left"
+                )
+            touched.append(numpy.arange(first, last))
+        if len(delta.stream):
+            before = self._cum[:, -1, :] if kept else self._base
+            self._append(self._cumulated(self._values(data.iloc[kept:]), before))
+            touched.append(numpy.arange(kept, len(data)))
+        if not touched:
+            return numpy.arange(0), delta.rolled
+        return numpy.unique(numpy.concatenate(touched)), delta.rolled
+
+
+def rolling(
+    model: DataModel, window: typing.Union[int, str], agg: str = "mean"
+) -> DataModel:
+    """ A model of rolling window aggregates of the numeric columns, like DataFrame.rolling.
+
+    window is a number of rows, or a time window ("10s") on a sorted datetime index.
+    Only windows including a streamed or patched row are computed again.
+    """
+    if agg not in AGGS:
+        raise TypeError(f"{agg} is not one of {AGGS}")
+    if not isinstance(window, int) and not (
+        isinstance(model.data.index, pandas.DatetimeIndex)
+        and model.data.index.is_monotonic_increasing
+    ):
+        raise TypeError("a time window requires a sorted datetime index.")
+
+    key = ("rolling", window, agg)
+    # not run again : it would apply the last delta twice
+    if key in model._related_models:
+        return model._related_models[key].keywords["model_out"]
+
+    state = _Rolling(model, window, agg)
+
+    def rolling_update(model_out: DataModel):
+        positions, rolled = state.updated()
+        if positions is None:
+            model_out(state.rows(numpy.arange(len(model.data))))
+        else:
+            _follow(model_out, state.rows(positions), rolled)
+        return model_out
+
+    model_out = DataModel(
+        data=state.rows(numpy.arange(len(model.data))),
+        name=f"{model._name} rolling({window}).{agg}",
+        debug=model._debug,
+    )
+    model._related_models[key] = functools.partial(rolling_update, model_out=model_out)
+    return model_out
+
+
+class _Resample:
+    """ Running state of time buckets : count, sum, sum of squares, min and max for each bucket. """
+
+    def __init__(self, model: DataModel, rule: str, agg: str):
+        self.model = model
+        self.rule = rule
+        self.agg = agg
+        self.columns = model.data.select_dtypes("number").columns
+        self._state = self._bucketed(model.data)
+
+    def _bucketed(self, rows: pandas.DataFrame) -> pandas.DataFrame:
+        values = rows[self.columns].astype(float)
+        grouped = values.groupby(rows.index.floor(self.rule))
+        return pandas.concat(
+            {
+                "count": grouped.count().astype(float),
+                "sum": grouped.sum(),
+                "squares": (values * values).groupby(rows.index.floor(self.rule)).sum(),
+                "min": grouped.min(),
+                "max": grouped.max(),
+            },
+            axis="columns",
+        )
+
+    def rows(self, buckets: typing.Optional[pandas.Index] = None) -> pandas.DataFrame:
+        state = self._state if buckets is None else self._state.loc[buckets]
+        # copied : the state is modified in place later on.
+        if self.agg in ("min", "max"):
+            return state[self.agg].copy()
+        return pandas.DataFrame(
+            _stats(
+                state["count"].to_numpy(),
+                state["sum"].to_numpy(),
+                state["squares"].to_numpy(),
+                self.agg,
+            ),
+            index=state.index,
+            columns=self.columns,
+        ).copy()
+
+    def updated(self) -> pandas.Index:
+        """ follows the model last update, returns the buckets to compute again. """
+        data, delta = self.model.data, self.model.delta
+        # patched buckets are computed again from their rows, streamed ones included (sorted index : a slice each).
+        patched = delta.patch.index.floor(self.rule).unique()
+        stream = delta.stream
+        streamed = self._bucketed(stream[~stream.index.floor(self.rule).isin(patched)])
+        step = pandas.tseries.frequencies.to_offset(self.rule)
+        recomputed = [
+            self._bucketed(
+                data.iloc[
+                    data.index.searchsorted(b) : data.index.searchsorted(b + step)
+                ]
+            )
+            for b in patched
+        ]
+
+        old = self._state.reindex(streamed.index)
+        combined = streamed.copy()
+        present = old["count"].notna().all(axis="columns")
+        for stat in ("count", "sum", "squares"):
+            combined.loc[present, stat] = (old[stat] + streamed[stat])[
+                present
+            ].to_numpy()
+        combined.loc[present, "min"] = numpy.fmin(old["min"], streamed["min"])[
+            present
+        ].to_numpy()
+        combined.loc[present, "max"] = numpy.fmax(old["max"], streamed["max"])[
+            present
+        ].to_numpy()
+
+        changes = pandas.concat([combined] + recomputed)
+        new = changes.index.difference(self._state.index)
+        self._state.loc[changes.index.intersection(self._state.index)] = changes.loc[
+            changes.index.intersection(self._state.index)
+        ]
+        if len(new):
+            self._state = pandas.concat([self._state, changes.loc[new]]).sort_index()
+        return changes.index
+
+
+def resample(model: DataModel, rule: str, agg: str = "mean") -> DataModel:
+    """ A model of time bucket aggregates of the numeric columns, like DataFrame.resample.
+
+    rule is a fixed frequency ("1min"), buckets are aligned as Timestamp.floor.
+    Only buckets of streamed rows are updated, from their running state. Patched buckets are computed again.
+    Note : rows removed from the model are still in their bucket.
+    """
+    if agg not in AGGS:
+        raise TypeError(f"{agg} is not one of {AGGS}")
+    if not (
+        isinstance(model.data.index, pandas.DatetimeIndex)
+        and model.data.index.is_monotonic_increasing
+    ):
+        raise TypeError("resample requires a sorted datetime index.")
+
+    key = ("resample", rule, agg)
+    # not run again : it would apply the last delta twice
+    if key in model._related_models:
+        return model._related_models[key].keywords["model_out"]
+
+    state = _Resample(model, rule, agg)
+
+    def resample_update(model_out: DataModel):
+        buckets = state.updated()
+        if len(buckets):
+            model_out.update(state.rows(buckets))
+        return model_out
+
+    model_out = DataModel(
+        data=state.rows(),
+        name=f"{model._name} resample({rule}).{agg}",
+        debug=model._debug,
+    )
+    model._related_models[key] = functools.partial(resample_update, model_out=model_out)
+    return model_out
+
+
+GROUP_AGGS = ("count", "sum", "mean", "last", "min", "max")
+
+
+class _GroupBy:
+    """ Running state of groups : count, sum, min, max or last value of each column, by group.
+
+    A reference to the previous model data is kept, to know the rows before a patch or a rollover.
+    """
+
+    # the running stats each aggregate needs
+    _STATS = {
+        "count": ("count",),
+        "sum": ("sum",),
+        "mean": ("count", "sum"),
+        "last": ("last",),
+        "min": ("min",),
+        "max": ("max",),
+    }
+
+    def __init__(self, model: DataModel, by: typing.List[str], agg: str):
+        self.model = model
+        self.by = by
+        self.agg = agg
+        values = model.data.drop(columns=by)
+        if agg not in ("count", "last"):
+            values = values.select_dtypes("number")
+        self.columns = values.columns
+        self._previous = model.data
+        self._state = self._grouped(model.data)
+
+    def _keys(self, rows: pandas.DataFrame) -> pandas.Index:
+        if len(self.by) == 1:
+            return pandas.Index(rows[self.by[0]])
+        return pandas.MultiIndex.from_frame(rows[self.by])
+
+    def _grouped(self, rows: pandas.DataFrame) -> pandas.DataFrame:
+        grouped = rows.groupby(self.by, sort=False)[list(self.columns)]
+        return pandas.concat(
+            {
+                stat: grouped.count().astype(float)
+                if stat == "count"
+                else getattr(grouped, stat)()
+                for stat in self._STATS[self.agg]
+            },
+            axis="columns",
+        )
+
+    def _combined(self, streamed: pandas.DataFrame) -> pandas.DataFrame:
+        """ streamed stats combined with the current ones, for each streamed group. """
+        old = self._state.reindex(streamed.index)
+
+        def combine(stat: str) -> pandas.DataFrame:
+            new, before = streamed[stat], old[stat]
+            if stat in ("count", "sum"):
+                return before.add(new, fill_value=0)
+            if stat == "min":
+                return numpy.fmin(before, new)
+            if stat == "max":
+                return numpy.fmax(before, new)
+            return new.where(new.notna(), before)  # last non null, as pandas
+
+        return pandas.concat(
+            {stat: combine(stat) for stat in self._STATS[self.agg]}, axis="columns"
+        )
+
+    def rows(self, groups: typing.Optional[pandas.Index] = None) -> pandas.DataFrame:
+        state = self._state if groups is None else self._state.loc[groups]
+        if self.agg == "mean":
+            return state["sum"] / state["count"]
+        # copied : the state is modified in place later on.
+        return state[self.agg].copy()
+
+    def updated(self) -> pandas.Index:
+        """ follows the model last update, returns the groups to compute again. """
+        data, delta, previous = self.model.data, self.model.delta, self._previous
+        self._previous = data
+
+        # groups losing or changing rows are computed again from their rows, others combined with streamed rows.
+        if delta.rolled is None:  # data replaced
+            touched = [previous, data]
+        else:
+            touched = [previous.iloc[: delta.rolled]] if delta.rolled else []
+            if len(delta.patch):
+                touched += [
+                    previous.loc[delta.patch.index],
+                    data.loc[delta.patch.index],
+                ]
+        recomputed = (
+            self._keys(pandas.concat(touched)).dropna().unique()
+            if touched
+            else self._state.index[:0]
+        )
+
+        changes = list()
+        if len(recomputed):
+            # Note : a scan of all rows, but only on patches and rollovers.
+            fresh = self._grouped(data[self._keys(data).isin(recomputed)]).reindex(
+                recomputed
+            )
+            if "count" in fresh:  # groups without rows anymore
+                fresh["count"] = fresh["count"].fillna(0)
+            changes.append(fresh)
+        stream = delta.stream
+        if len(stream) and len(recomputed):
+            stream = stream[~self._keys(stream).isin(recomputed)]
+        if len(stream):
+            changes.append(self._combined(self._grouped(stream)))
+        if not changes:
+            return self._state.index[:0]
+
+        changes = pandas.concat(changes)
+        known = changes.index.isin(self._state.index)
+        self._state.loc[changes.index[known]] = changes[known]
+        if not known.all():
+            self._state = pandas.concat([self._state, changes[~known]])
+        return changes.index
+
+
+def groupby(
+    model: DataModel, by: typing.Union[str, typing.List[str]], agg: str = "mean"
+) -> DataModel:
+    """ A model of aggregates by group, keyed on the by columns, like DataFrame.groupby(by).agg().
+
+    agg is one of GROUP_AGGS, on numeric columns (all columns for count and last).
+    Streamed rows are combined with the running state of their group, changed groups are patched,
+    new groups are streamed. Groups of patched or dropped rows are computed again from their rows.
+    Note : groups without rows anymore are not removed, they have a count of 0 and NaN aggregates.
+    """
+    by = [by] if isinstance(by, str) else list(by)
+    if agg not in GROUP_AGGS:
+        raise TypeError(f"{agg} is not one of {GROUP_AGGS}")
+    if not set(by) <= set(model.columns):
+        raise TypeError(f"{by} are not all columns of {model._name}.")
+
+    key = ("groupby", tuple(by), agg)
+    # not run again : it would apply the last delta twice
+    if key in model._related_models:
+        return model._related_models[key].keywords["model_out"]
+
+    state = _GroupBy(model, by, agg)
+
+    def groupby_update(model_out: DataModel):
+        groups = state.updated()
+        if len(groups):
+            model_out.update(state.rows(groups))
+        return model_out
+
+    model_out = DataModel(
+        data=state.rows(),
+        name=f"{model._name} groupby({', '.join(by)}).{agg}",
+        debug=model._debug,
+    )
+    model._related_models[key] = functools.partial(groupby_update, model_out=model_out)
+    return model_out
+
+
+def eval(model: DataModel, expr: str) -> DataModel:
+    """ A model with columns computed from an expression, like DataFrame.eval("c = a * b + log(d)").
+
+    The expression is evaluated by pandas (with numexpr, multithreaded, if it is installed),
+    on the streamed and patched rows only, not row by row as apply does.
+    """
+    result = model.data.eval(expr)  # invalid expressions fail here, not on an update
+    if not isinstance(result, pandas.DataFrame):
+        raise TypeError(f"{expr} does not assign a column, like 'c = a * b'.")
+
+    key = ("eval", expr)
+    # not run again : it would drop the first rows twice after a rollover
+    if key in model._related_models:
+        return model._related_models[key].keywords["model_out"]
+
+    def eval_update(model_out: DataModel):
+        delta = model.delta
+        if delta.rolled is None:  # data replaced
+            model_out(model.data.eval(expr))
+        else:
+            # full rows : a patch can be on some columns only.
+            rows = pandas.concat([model._rows(delta.patch.index), delta.stream])
+            _follow(model_out, rows.eval(expr), delta.rolled)
+        return model_out
+
+    model_out = DataModel(
+        data=result, name=f"{model._name} eval({expr})", debug=model._debug,
+    )
+    model._related_models[key] = functools.partial(eval_update, model_out=model_out)
+    return model_out
@@ -0,0 +1,104 @@
+"""
+Opt-in sampling profiler, to see where the event loop time goes in a live server.
+"""
+from __future__ import annotations
+
+import collections
+import os
+import sys
+import threading
+import typing
+
+
+class SamplingProfiler:
+    """ Samples the stack of one thread (the event loop one, where the profiler is created by default).
+
+    A background thread takes a sample each interval, the sampled thread itself is not instrumented :
+    the update pipeline (DataModel.__call__, related models, next-tick callbacks) and the server code
+    all show up in the stacks, at the cost of one stack walk per interval, and only while running.
+    Stacks are aggregated in the folded format of flamegraph.pl and speedscope.
+    """
+
+    def __init__(self, interval: float = 0.005, thread_id: typing.Optional[int] = None):
+        self.interval = interval
+        self.thread_id = thread_id if thread_id is not None else threading.get_ident()
+        self.stacks: typing.Counter[str] = collections.Counter()
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._thread: typing.Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def samples(self) -> int:
+        with self._lock:
+            return sum(self.stacks.values())
+
+    def start(self) -> SamplingProfiler:
+        if not self.running:
+            self._stopping.clear()
+            self._thread = threading.Thread(
+                target=self._sampling, name="livebokeh-profiler", daemon=True
+            )
+            self._thread.start()
+        return self
+
+    def stop(self) -> SamplingProfiler:
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        return self
+
+    def reset(self) -> SamplingProfiler:
+        with self._lock:
+            self.stacks.clear()
+        return self
+
+    def _sampling(self):
+        while not self._stopping.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:  # thread is gone
+                return
+            stack = self._folded(frame)
+            del frame  # not keeping the sampled thread frames alive
+            with self._lock:
+                self.stacks[stack] += 1
+
+    @staticmethod
+    def _folded(frame) -> str:
+        names = list()
+        while frame is not None:
+            code = frame.f_code
+            names.append(
+                f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+            )
+            frame = frame.f_back
+        return ";".join(reversed(names))
+
+    def folded(self) -> str:
+        """ one line per stack, root first, with its sample count. """
+        with self._lock:
+            stacks = self.stacks.most_common()
+        return "\n".join(f"{stack} {count}" for stack, count in stacks)
+
+    def summary(self, top: int = 30) -> str:
+        """ functions with the largest share of samples, including their callees. """
+        with self._lock:
+            stacks = self.stacks.most_common()
+        total = sum(count for _, count in stacks)
+        inclusive: typing.Counter[str] = collections.Counter()
+        for stack, count in stacks:
+            for name in set(stack.split(";")):  # once per stack, for recursive calls
+                inclusive[name] += count
+
+        lines = [
+            f"{'running' if self.running else 'stopped'}, {total} samples every {self.interval * 1000:g}ms"
+        ]
+        lines += [
+            f"{100 * count / total:6.1f}%  {name}"
+            for name, count in inclusive.most_common(top)
+        ]
+        return "\n".join(lines)
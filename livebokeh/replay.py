@@ -0,0 +1,108 @@
+"""
+Replaying precomputed rows as a live source : recorded sessions, demos.
+"""
+from __future__ import annotations
+
+import asyncio
+import pathlib
+import typing
+
+import pandas
+from pandas.api import types
+
+from livebokeh.storage import ColumnFiles
+
+
+def load(path: typing.Union[str, pathlib.Path]) -> pandas.DataFrame:
+    """ a recorded frame : a ColumnFiles directory (like a spilled history), csv, parquet or pickle. """
+    path = pathlib.Path(path)
+    if path.is_dir():
+        return ColumnFiles(path).read()
+    if path.suffix == ".csv":
+        return pandas.read_csv(path, index_col=0, parse_dates=True)
+    if path.suffix == ".parquet":
+        return pandas.read_parquet(path)
+    return pandas.read_pickle(path)
+
+
+class Replay:
+    """ Async iterable of the rows of a precomputed frame, to ingest in a DataModel (see DataModel.ingest).
+
+    Every 1/rate seconds, a step yields the next rows : `rows` of them, or with speed (datetime index only),
+    the rows recorded during the elapsed time multiplied by speed.
+    Steps are slices of the frame, appended to the model : a step costs its rows, not the rows before.
+    With loop, the frame is replayed again after its last row, its index shifted to keep appending.
+    """
+
+    def __init__(
+        self,
+        frame: typing.Union[pandas.DataFrame, str, pathlib.Path],
+        rate: float = 5.0,
+        rows: int = 1,
+        speed: typing.Optional[float] = None,
+        loop: bool = False,
+    ):
+        self.frame = frame if isinstance(frame, pandas.DataFrame) else load(frame)
+        self.rate = rate
+        self.rows = rows
+        self.speed = speed
+        self.loop = loop
+
+        index = self.frame.index
+        if not index.is_monotonic_increasing:
+            raise TypeError("a replayed frame must have a sorted index.")
+        if speed is not None and not isinstance(index, pandas.DatetimeIndex):
+            raise TypeError("replaying at a speed requires a datetime index.")
+        if loop and not (
+            len(index)
+            and (
+                isinstance(index, pandas.DatetimeIndex) or types.is_numeric_dtype(index)
+            )
+        ):
+            raise TypeError("looping requires rows, with a datetime or numeric index.")
+
+    @property
+    def _period(self):
+        """ index shift between two laps : the frame span, plus its mean spacing. """
+        index = self.frame.index
+        if len(index) < 2:
+            return (
+                pandas.Timedelta(seconds=1)
+                if isinstance(index, pandas.DatetimeIndex)
+                else 1
+            )
+        span = index[-1] - index[0]
+        if types.is_integer_dtype(index):  # keeping integer labels
+            return span + max(span // (len(index) - 1), 1)
+        return span + span / (len(index) - 1)
+
+    async def __aiter__(self) -> typing.AsyncIterator[pandas.DataFrame]:
+        frame, index = self.frame, self.frame.index
+        loop = asyncio.get_running_loop()
+        lap, position = 0, 0
+        lap_start = loop.time()  # wall time when the lap first row was recorded
+        while True:
+            await asyncio.sleep(1 / self.rate)
+            if self.speed is None:
+                stop = min(position + self.rows, len(frame))
+            else:
+                played = index[0] + pandas.Timedelta(
+                    seconds=(loop.time() - lap_start) * self.speed
+                )
+                stop = index.searchsorted(played, side="right")
+
+            if stop > position:
+                step = frame.iloc[position:stop]
+                if lap:
+                    step = step.set_axis(step.index + lap * self._period, axis="index")
+                yield step
+                position = stop
+
+            if position == len(frame):
+                if not self.loop:
+                    return
+                lap, position = lap + 1, 0
+                if self.speed is not None:
+                    lap_start += (
+                        pandas.Timedelta(self._period).total_seconds() / self.speed
+                    )
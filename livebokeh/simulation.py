@@ -0,0 +1,96 @@
+"""
+Simulated live sources : many independent paths, advanced together by one vectorized step.
+To stress-test dashboards with hundreds of live series from one producer.
+"""
+from __future__ import annotations
+
+import asyncio
+import typing
+
+import numpy
+import pandas
+
+# a step computes the next values of all paths at once, from the current ones.
+Step = typing.Callable[[numpy.random.Generator, numpy.ndarray], numpy.ndarray]
+
+
+def random_walk(scale: float = 1.0, drift: float = 0.0) -> Step:
+    """ gaussian increments. """
+
+    def step(rng: numpy.random.Generator, values: numpy.ndarray) -> numpy.ndarray:
+        return values + drift + scale * rng.standard_normal(len(values))
+
+    return step
+
+
+def markov_chain(transitions) -> Step:
+    """ states are positions in the transitions matrix, each row are the probabilities of the next state. """
+    cumulated = numpy.cumsum(numpy.asarray(transitions, dtype=float), axis=1)
+
+    def step(rng: numpy.random.Generator, values: numpy.ndarray) -> numpy.ndarray:
+        draws = rng.random(len(values))
+        # the first state whose cumulated probability is above the draw
+        states = (draws[:, None] >= cumulated[values.astype(int)]).sum(axis=1)
+        return states.clip(max=len(cumulated) - 1)
+
+    return step
+
+
+def uniform_integers(low: int, high: int) -> Step:
+    """ independent integers between low and high (included), like random.randint. """
+
+    def step(rng: numpy.random.Generator, values: numpy.ndarray) -> numpy.ndarray:
+        return rng.integers(low, high, len(values), endpoint=True)
+
+    return step
+
+
+class Paths:
+    """ Independent paths of a process, one column each, to ingest in a DataModel (see DataModel.ingest).
+
+    As an async iterable, each period yields one row with all paths, streamed as one delta.
+    With a seed, values are reproducible. With clock, rows are indexed by time, else by step number.
+    """
+
+    def __init__(
+        self,
+        step: Step,
+        paths: int = 100,
+        initial=0,
+        seed: typing.Optional[int] = None,
+        period: float = 1.0,
+        columns: typing.Optional[typing.List[str]] = None,
+        clock: bool = True,
+    ):
+        if columns is not None:
+            paths = len(columns)
+        self.step = step
+        self.rng = numpy.random.default_rng(seed)
+        self.values = numpy.broadcast_to(numpy.asarray(initial), (paths,)).copy()
+        self.columns = (
+            columns if columns is not None else [f"path{i}" for i in range(paths)]
+        )
+        self.period = period
+        self.clock = clock
+        self.steps = 0
+
+    def advance(self, steps: int = 1) -> pandas.DataFrame:
+        """ the next rows, with one step for all paths per row. """
+        rows = list()
+        for _ in range(steps):
+            self.values = self.step(self.rng, self.values)
+            rows.append(self.values)
+
+        if self.clock:  # the last row is now, the others one period apart before
+            index = pandas.Timestamp.now() - pandas.to_timedelta(
+                numpy.arange(steps)[::-1] * self.period, unit="s"
+            )
+        else:
+            index = pandas.RangeIndex(self.steps, self.steps + steps)
+        self.steps += steps
+        return pandas.DataFrame(numpy.stack(rows), index=index, columns=self.columns)
+
+    async def __aiter__(self) -> typing.AsyncIterator[pandas.DataFrame]:
+        while True:
+            await asyncio.sleep(self.period)
+            yield self.advance()
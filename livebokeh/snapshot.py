@@ -0,0 +1,199 @@
+"""
+Snapshots of DataModels on disk, to keep history across restarts.
+
+Each registered model has a directory with :
+- snapshot/ : column files (see storage) of the model data, and the number of cold rows it includes.
+- cold/ : column files of the rows spilled by the model (see DataModel spill), only appended to.
+- delta.log : appended and modified rows since that snapshot, replayed on restore.
+"""
+from __future__ import annotations
+
+import asyncio
+import os
+import pathlib
+import pickle
+import shutil
+import typing
+
+import pandas
+from pandas.api import types
+
+from livebokeh.datamodel import DataModel
+from livebokeh.storage import ColumnFiles
+
+
+def _upsert(data: pandas.DataFrame, rows: pandas.DataFrame) -> pandas.DataFrame:
+    """ replaces rows with the same index, appends the others. """
+    if rows.empty:
+        return data
+    merged = pandas.concat([data[~data.index.isin(rows.index)], rows])
+    return merged.sort_index() if data.index.is_monotonic_increasing else merged
+
+
+class Snapshots:
+    """ Periodic snapshots of registered models, and an append-only delta log in between.
+
+    Only fixed size dtypes can be snapshotted (see ColumnFiles).
+    Note : rows removed from a model are only forgotten on the next snapshot.
+    """
+
+    def __init__(self, path: typing.Union[str, pathlib.Path]):
+        self.path = pathlib.Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self._models: typing.Dict[str, DataModel] = dict()
+        self._logs: typing.Dict[str, typing.BinaryIO] = dict()
+
+    def _dir(self, key: str) -> pathlib.Path:
+        return self.path / key
+
+    def _last(self, key: str) -> pathlib.Path:
+        """ the last complete snapshot. """
+        snapshot = self._dir(key) / "snapshot"
+        if not snapshot.exists():  # interrupted while replacing it
+            snapshot = self._dir(key) / "snapshot.old"
+        return snapshot
+
+    def _cold_rows(self, key: str) -> int:
+        """ rows of cold/ in the last snapshot. Later ones may be the end of an interrupted snapshot. """
+        rows = self._last(key) / "cold_rows"
+        return int(rows.read_text()) if rows.exists() else 0
+
+    def restore(self, key: str, after=None) -> typing.Optional[pandas.DataFrame]:
+        """ last snapshot and the delta log after it, None if nothing was saved.
+        after is an index label, to skip rows already known (see DataModel spill).
+        """
+        snapshot = self._last(key)
+        log = self._dir(key) / "delta.log"
+        if not snapshot.exists() and not log.exists():
+            return None
+
+        data = None
+        if snapshot.exists():
+            cold, cold_rows = ColumnFiles(self._dir(key) / "cold"), self._cold_rows(key)
+            start = (
+                min(cold.locate(after, "right"), cold_rows)
+                if after is not None and cold_rows
+                else 0
+            )
+            frames = [
+                f
+                for f in (cold.read(start, cold_rows), ColumnFiles(snapshot).read())
+                if len(f.columns)
+            ]
+            data = pandas.concat(frames) if frames else None
+        if log.exists():
+            with open(log, "rb") as f:
+                while True:
+                    try:
+                        rows = pickle.load(f)
+                    except (EOFError, pickle.UnpicklingError):
+                        break  # end of log, or last write interrupted
+                    data = rows if data is None else _upsert(data, rows)
+        if data is not None and after is not None:
+            data = data[data.index > after]
+        return data
+
+    def register(self, model: DataModel, key: typing.Optional[str] = None) -> DataModel:
+        """ restores the model data if it was saved, and saves all its updates from now on. """
+        key = key if key is not None else model._name
+        if key in self._models:
+            raise KeyError(f"{key} is already registered.")
+        for c, dt in model.data.dtypes.items():
+            # extension dtypes (categoricals, ...) are not numpy ones, they cannot be memory mapped either.
+            if types.is_object_dtype(dt) or types.is_extension_array_dtype(dt):
+                raise TypeError(f"{c} dtype {dt} cannot be snapshotted.")
+
+        self._dir(key).mkdir(parents=True, exist_ok=True)
+        if model._spill is not None:
+            self._restore_cold(key, model._spill)
+        spilled = model._spill is not None and len(model._spill)
+        restored = self.restore(key, after=model._spill.index[-1] if spilled else None)
+        if restored is not None:
+            model(restored)
+
+        self._models[key] = model
+        self._logs[key] = open(self._dir(key) / "delta.log", "ab")
+        model.on_update(lambda m, key=key: self._log(key, m))
+        return model
+
+    def _restore_cold(
+        self, key: str, spill: ColumnFiles, chunk_rows: int = 1_000_000
+    ) -> None:
+        """ appends the cold rows not in spill yet, by chunks : the cold history is never loaded at once. """
+        cold, cold_rows = ColumnFiles(self._dir(key) / "cold"), self._cold_rows(key)
+        if not cold_rows:
+            return
+        start = cold.locate(spill.index[-1], "right") if len(spill) else 0
+        for first in range(start, cold_rows, chunk_rows):
+            spill.append(cold.read(first, min(first + chunk_rows, cold_rows)))
+
+    def unregister(self, model: DataModel) -> None:
+        """ a last snapshot of the model, then its updates are not saved anymore. Its key can be registered again. """
+        for key in [k for k, m in self._models.items() if m is model]:
+            self._snapshot(key, model)
+            self._logs.pop(key).close()
+            del self._models[key]
+
+    def _log(self, key: str, model: DataModel) -> None:
+        if self._models.get(key) is not model:  # closed, or unregistered
+            return
+        rows = pandas.concat([model.delta.patch, model.delta.stream])
+        if not rows.empty:
+            pickle.dump(rows, self._logs[key])
+            self._logs[key].flush()
+
+    def snapshot(self, chunk_rows: int = 1_000_000) -> None:
+        """ a new snapshot for each model, then truncates its log. """
+        for key, model in self._models.items():
+            self._snapshot(key, model, chunk_rows)
+
+    def _snapshot(
+        self, key: str, model: DataModel, chunk_rows: int = 1_000_000
+    ) -> None:
+        d = self._dir(key)
+        tmp = d / "snapshot.tmp"
+        shutil.rmtree(tmp, ignore_errors=True)
+
+        snap = ColumnFiles(tmp)
+        spill, cold_rows = model._spill, self._cold_rows(key)
+        if spill is not None and len(spill) >= cold_rows:
+            # spilled rows are immutable : only the ones spilled since the last snapshot are written.
+            cold = ColumnFiles(d / "cold").truncate(cold_rows)
+            for start in range(cold_rows, len(spill), chunk_rows):
+                cold.append(spill.read(start, start + chunk_rows))
+            cold_rows = len(spill)
+        else:
+            # not the history of cold/ anymore : in the snapshot, not loading it all at once.
+            if spill is not None:
+                for start in range(0, len(spill), chunk_rows):
+                    snap.append(spill.read(start, start + chunk_rows))
+            cold_rows = 0
+        snap.append(model.data)
+        (tmp / "cold_rows").write_text(str(cold_rows))
+
+        # at any time, a complete snapshot exists on disk
+        if (d / "snapshot").exists():
+            os.replace(d / "snapshot", d / "snapshot.old")
+        os.replace(tmp, d / "snapshot")
+        shutil.rmtree(d / "snapshot.old", ignore_errors=True)
+
+        # Note : if interrupted before this, the log is replayed twice, harmless with upserts.
+        self._logs[key].truncate(0)
+        self._logs[key].seek(0)
+
+    def close(self) -> None:
+        """ models are not registered anymore, their updates are not saved. """
+        for log in self._logs.values():
+            log.close()
+        self._logs.clear()
+        self._models.clear()
+
+    async def run(self, period_secs: float = 60.0) -> None:
+        """ periodic snapshots, and a last one when cancelled. """
+        try:
+            while True:
+                await asyncio.sleep(period_secs)
+                self.snapshot()
+        finally:
+            self.snapshot()
+            self.close()
@@ -0,0 +1,107 @@
+"""
+On disk storage of dataframes, by columns, read back lazily through memory mapping.
+"""
+from __future__ import annotations
+
+import json
+import os
+import pathlib
+import typing
+
+import numpy
+import pandas
+
+
+class ColumnFiles:
+    """ Append-only columns in a directory, one raw binary file each, plus the index.
+
+    Only fixed size dtypes can be memory mapped (numbers, booleans, datetimes), not python objects.
+    """
+
+    def __init__(self, path: typing.Union[str, pathlib.Path]):
+        self.path = pathlib.Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+
+        meta = self.path / "columns.json"
+        # list of [name, dtype], the first one is the index.
+        self._columns: typing.Optional[typing.List[typing.List[str]]] = (
+            json.loads(meta.read_text()) if meta.exists() else None
+        )
+
+    def _file(self, i: int) -> pathlib.Path:
+        return self.path / f"{i}.bin"
+
+    @property
+    def columns(self) -> typing.List[str]:
+        return [c for c, _ in self._columns[1:]] if self._columns is not None else []
+
+    def __len__(self):
+        if self._columns is None:
+            return 0
+        return self._file(0).stat().st_size // numpy.dtype(self._columns[0][1]).itemsize
+
+    def append(self, df: pandas.DataFrame) -> ColumnFiles:
+        if df.empty:
+            return self
+
+        if self._columns is None:
+            self._columns = [[df.index.name, df.index.dtype.str]] + [
+                [c, df[c].dtype.str] for c in df.columns
+            ]
+            for c, dt in self._columns:
+                if numpy.dtype(dt).hasobject:
+                    raise TypeError(f"{c} dtype {dt} cannot be memory mapped.")
+            (self.path / "columns.json").write_text(json.dumps(self._columns))
+        elif df.columns.to_list() != self.columns:
+            raise TypeError(f"{df.columns} do not match stored {self.columns}")
+
+        for i, (c, dt) in enumerate(self._columns):
+            values = df.index.values if i == 0 else df[c].values
+            with open(self._file(i), "ab") as f:
+                f.write(numpy.ascontiguousarray(values, dtype=dt).tobytes())
+        return self
+
+    def truncate(self, rows: int) -> ColumnFiles:
+        """ keeps the first rows only, in all files : also drops the end of an interrupted append. """
+        if self._columns is not None:
+            for i, (_, dt) in enumerate(self._columns):
+                if self._file(i).exists():
+                    os.truncate(self._file(i), rows * numpy.dtype(dt).itemsize)
+        return self
+
+    def _memmap(self, i: int) -> numpy.ndarray:
+        dtype = numpy.dtype(self._columns[i][1])
+        if len(self) == 0:  # cannot mmap an empty file
+            return numpy.empty(0, dtype=dtype)
+        return numpy.memmap(self._file(i), dtype=dtype, mode="r", shape=(len(self),))
+
+    @property
+    def index(self) -> numpy.ndarray:
+        """ memory mapped, not loaded. """
+        return self._memmap(0) if self._columns is not None else numpy.empty(0)
+
+    def locate(self, label, side: str = "left") -> int:
+        """ position of an index label, assuming a sorted index. """
+        index = self.index
+        return int(
+            numpy.searchsorted(index, numpy.asarray(label, dtype=index.dtype), side)
+        )
+
+    def read(
+        self, start: int = 0, stop: typing.Optional[int] = None, step: int = 1
+    ) -> pandas.DataFrame:
+        """ only the selected rows are loaded from disk. """
+        if self._columns is None:
+            return pandas.DataFrame()
+        rows = slice(start, stop, step)
+        return pandas.DataFrame(
+            data={
+                c: numpy.array(self._memmap(i)[rows])
+                for i, (c, _) in enumerate(self._columns)
+                if i > 0
+            },
+            columns=self.columns,
+            index=pandas.Index(
+                numpy.array(self._memmap(0)[rows]), name=self._columns[0][0]
+            ),
+        )
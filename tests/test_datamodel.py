@@ -1,3 +1,7 @@
+import asyncio
+import subprocess
+import sys
+import threading
 from datetime import datetime, timedelta
 from unittest.mock import MagicMock
 
@@ -9,6 +13,7 @@ import random
 from bokeh.models import DataSource
 
 from livebokeh.datamodel import DataModel
+from livebokeh.storage import ColumnFiles
 
 
 def test_intindexed_data():
@@ -71,6 +76,9 @@ def test_source():
     assert ds.column_names == df.reset_index().columns.to_list()
     for c in df.columns:
         assert (ds.data[c] == df[c]).all()
+    # datetimes are already converted, for bokeh to not do it for each document.
+    assert ds.data["index"].dtype == "float64"
+    assert ds.data["index"][0] == pandas.Timestamp(now).value / 1e6
 
     assert ds in dm._rendered_datasources
 
@@ -104,13 +112,38 @@ def test_data_patch():
     )
 
     patches = dm._patch(df2)
-    # Note : we need to drop timestamp index and retrieve the integer index
-    assert patches == {
-        col: [(i, v) for i, v in s.items()]
-        for col, s in df2.reset_index(drop=True).to_dict("series").items()
-    }
+    # Note : positions in the datasource, not index labels.
+    # All rows changed : each column is replaced, as a patch of the whole column.
+    assert list(patches) == ["random1", "random2"]
+    for col, patch in patches.items():
+        assert len(patch) == 1
+        assert patch[0][0] == slice(0, 2)
+        assert list(patch[0][1]) == df2[col].to_list()
 
-    # TODO : more fine grained tests...
+
+def test_data_patch_runs():
+    df = pandas.DataFrame(data={"random1": range(100), "random2": range(100)})
+    dm = DataModel(name="TestDataModel", data=df, debug=False)
+
+    df2 = df.copy()
+    df2.loc[10:19, "random1"] = -1  # a run
+    df2.loc[50, "random1"] = -2  # a single row
+    df2.loc[70, "random2"] = -3  # another column
+
+    patches = dm._patch(df2)
+    assert patches["random1"][0][0] == slice(10, 20)
+    assert list(patches["random1"][0][1]) == [-1] * 10
+    assert patches["random1"][1] == (50, -2)
+    # unchanged cells of patched rows are not sent
+    assert patches["random2"] == [(70, -3)]
+
+    # applied by bokeh
+    source = dm.source
+    flush = _ordered_document(source)
+    dm(df2)
+    flush()
+    assert list(source.data["random1"]) == df2["random1"].to_list()
+    assert list(source.data["random2"]) == df2["random2"].to_list()
 
 
 def test_data_stream():
@@ -145,5 +178,375 @@ def test_data_stream():
     assert (streamable == df2).all().all()
 
 
+def test_data_stream_sorted():
+    df = pandas.DataFrame(
+        data={"random1": [random.randint(-10, 10) for _ in range(4)]},
+        index=[0, 2, 4, 6],
+    )
+    dm = DataModel(name="TestDataModel", data=df)
+
+    appended = pandas.concat([df, pandas.DataFrame(data={"random1": [1]}, index=[8])])
+    assert dm._stream(appended).index.to_list() == [8]
+
+    # a row inserted before the last one is still detected
+    inserted = pandas.concat(
+        [df, pandas.DataFrame(data={"random1": [1, 2]}, index=[3, 8])]
+    ).sort_index()
+    assert dm._stream(inserted).index.to_list() == [3, 8]
+
+    # an unsorted index is still supported
+    assert dm._stream(inserted.iloc[::-1]).index.to_list() == [3, 8]
+
+    # a row removed and another inserted, as many rows before the last one : still in the delta
+    replaced = pandas.DataFrame(
+        data={"random1": [0, 1, 4, 6, 8]}, index=[0, 1, 4, 6, 8]
+    )
+    dm(replaced)
+    assert dm.delta.rolled is None
+    assert dm.delta.stream.index.to_list() == [1, 8]
+
+
+def _ordered_document(source):
+    """ a fake document for source, running its next tick callbacks in order, on demand. """
+    callbacks = []
+    source._document = MagicMock(add_next_tick_callback=lambda cb: callbacks.append(cb))
+
+    def flush():
+        while callbacks:
+            callbacks.pop(0)()
+
+    return flush
+
+
+@pytest.mark.parametrize("index", [[0, 1, 2, 3], [3, 1, 2, 0]])  # sorted or not
+def test_patch_positions(index):
+    df = pandas.DataFrame(data={"random1": [0, 1, 2, 3]}, index=index)
+    dm = DataModel(name="TestDataModel", data=df, debug=False)
+    source = dm.source
+    flush = _ordered_document(source)
+
+    def check():
+        flush()
+        assert list(source.data["index"]) == dm.data.index.to_list()
+        assert list(source.data["random1"]) == dm.data["random1"].to_list()
+
+    # patching the last rows, not the first ones
+    dm.update(pandas.DataFrame(data={"random1": [12, 13]}, index=index[2:]))
+    check()
+
+    # dropping first rows and streaming : rollover, and positions shift
+    dm(
+        pandas.concat(
+            [dm.data.iloc[2:], pandas.DataFrame(data={"random1": [4]}, index=[4])]
+        )
+    )
+    assert dm.metrics.pending_callbacks == 1  # stream, no data replace
+    check()
+    dm.update(pandas.DataFrame(data={"random1": [-4, -2]}, index=[4, index[2]]))
+    check()
+
+    # removing a row in the middle : data is replaced
+    dm(dm.data.drop(index=index[3]))
+    check()
+    dm.update(pandas.DataFrame(data={"random1": [44]}, index=[4]))
+    check()
+
+
+@pytest.mark.parametrize("index", [[0, 1, 2, 3], [3, 1, 2, 0]])  # sorted or not
+def test_pull(index):
+    from bokeh.document import Document
+
+    df = pandas.DataFrame(data={"random1": [0, 1, 2, 3]}, index=index)
+    dm = DataModel(name="TestDataModel", data=df, debug=False)
+    pushed, pulled = dm.source, dm.source
+    flush = _ordered_document(pushed)
+    doc = Document()
+    doc.add_root(pulled)
+    dm.pull(doc, period_ms=100)
+    assert len(doc.session_callbacks) == 1
+
+    def check():
+        flush()
+        dm._pull(doc)  # the periodic callback
+        for source in (pushed, pulled):
+            assert list(source.data["index"]) == dm.data.index.to_list()
+            assert list(source.data["random1"]) == dm.data["random1"].to_list()
+
+    # several updates between two pulls : patches, streams and rollover
+    dm.update(pandas.DataFrame(data={"random1": [12, 13]}, index=index[2:]))
+    dm(
+        pandas.concat(
+            [dm.data.iloc[2:], pandas.DataFrame(data={"random1": [4]}, index=[4])]
+        )
+    )
+    dm.update(pandas.DataFrame(data={"random1": [-4, -2, 5]}, index=[4, index[2], 5]))
+    # only the pushed datasource has a callback waiting, with all updates since its version
+    assert dm.metrics.pending_callbacks == 1
+    assert dm.metrics.coalesced == 2
+    check()
+
+    # nothing changed, nothing sent
+    pulled.data = {"index": [], "random1": []}
+    dm._pull(doc)
+    assert pulled.data["index"] == []
+    pulled.data = dm._source_data(dm.data)
+
+    # removing a row in the middle : data is replaced
+    dm(dm.data.drop(index=index[3]))
+    dm.update(pandas.DataFrame(data={"random1": [44]}, index=[4]))
+    check()
+
+
+def test_pull_rolled_past():
+    from bokeh.document import Document
+
+    df = pandas.DataFrame(data={"random1": [0, 1, 2]})
+    dm = DataModel(name="TestDataModel", data=df, debug=False)
+    source = dm.source
+    doc = Document()
+    doc.add_root(source)
+    dm.pull(doc)
+
+    # more rows rolled off than the datasource had, between two pulls
+    for i in range(3, 8):
+        dm(
+            pandas.DataFrame(
+                data={"random1": [i - 2, i - 1, i]}, index=[i - 2, i - 1, i]
+            )
+        )
+    dm._pull(doc)
+    assert list(source.data["index"]) == [5, 6, 7]
+    assert list(source.data["random1"]) == [5, 6, 7]
+    assert dm.metrics.resyncs == 0
+
+
+def test_lagging_resync():
+    df = pandas.DataFrame(data={"random1": [0, 1, 2, 3]})
+    dm = DataModel(name="TestDataModel", data=df, debug=False, log_versions=2)
+    lagging, other = dm.source, dm.source
+    flush = _ordered_document(lagging)
+    # new datasources do not share arrays : they are patched in place.
+    assert lagging.data["random1"] is not other.data["random1"]
+
+    def check():
+        flush()
+        assert list(lagging.data["index"]) == dm.data.index.to_list()
+        assert list(lagging.data["random1"]) == dm.data["random1"].to_list()
+
+    # behind, but still in the log : the changes since its version only
+    dm.update(pandas.DataFrame(data={"random1": [10]}, index=[0]))
+    dm.update(pandas.DataFrame(data={"random1": [4]}, index=[4]))
+    check()
+    assert dm.metrics.coalesced == 1
+    assert dm.metrics.resyncs == 0
+
+    # out of the log : the full data
+    for i in range(3):
+        dm.update(pandas.DataFrame(data={"random1": [i]}, index=[i + 5]))
+    check()
+    assert dm.metrics.coalesced == 3
+    assert dm.metrics.resyncs == 1
+    assert list(other.data["random1"]) == [0, 1, 2, 3]
+
+
+def test_lagging_rolled_past():
+    df = pandas.DataFrame(data={"random1": [0, 1, 2]})
+    dm = DataModel(name="TestDataModel", data=df, debug=False)
+    lagging, other = dm.source, dm.source
+    flush_lagging = _ordered_document(lagging)
+    flush_other = _ordered_document(other)
+
+    def check(source):
+        assert list(source.data["index"]) == dm.data.index.to_list()
+        assert list(source.data["random1"]) == dm.data["random1"].to_list()
+
+    # the lagging session callbacks do not run while the model rolls past its length
+    for i in range(3, 8):
+        dm(
+            pandas.DataFrame(
+                data={"random1": [i - 2, i - 1, i]}, index=[i - 2, i - 1, i]
+            )
+        )
+        flush_other()
+        check(other)
+    dm.update(pandas.DataFrame(data={"random1": [60]}, index=[6]))
+    flush_other()
+    flush_lagging()
+    check(other)
+    check(lagging)
+    assert list(lagging.data["random1"]) == [5, 60, 7]
+    assert dm.metrics.coalesced == 5
+    assert dm.metrics.resyncs == 0
+
+
+def test_getitem():
+    # TODO : generate sample data with hypothesis
+    df = pandas.DataFrame(
+        data=[
+            [random.randint(-10, 10), random.randint(-10, 10)],
+            [random.randint(-10, 10), random.randint(-10, 10)],
+        ],
+        columns=["random1", "random2"],
+        index=[0, 1],
+    )
+
+    dm = DataModel(name="TestDataModel", data=df)
+
+    sub = dm[["random2"]]
+    assert sub.data.columns.to_list() == ["random2"]
+    assert (sub.data["random2"] == df["random2"]).all()
+
+    # updates are propagated
+    dm(df * 2)
+    assert (sub.data["random2"] == df["random2"] * 2).all()
+
+
+def test_spill(tmp_path):
+    df = pandas.DataFrame(
+        data={"random1": [random.randint(-10, 10) for _ in range(5)]},
+        index=pandas.date_range("2020-01-01", periods=5, freq="s"),
+    )
+
+    dm = DataModel(
+        name="TestDataModel", data=df, spill=ColumnFiles(tmp_path), hot_rows=2
+    )
+    assert len(dm.data) == 2
+    pandas.testing.assert_frame_equal(dm.history(), df, check_freq=False)
+
+    more = pandas.DataFrame(
+        data={"random1": [11, 12]},
+        index=pandas.date_range("2020-01-01 00:00:05", periods=2, freq="s"),
+    )
+    # full data updates, including spilled rows, modified: they are ignored
+    dm(pandas.concat([df * 2, more]))
+
+    assert len(dm.data) == 2
+    assert dm.data["random1"].to_list() == [11, 12]
+    history = dm.history()
+    assert len(history) == 7
+    assert history["random1"].to_list()[:3] == df["random1"].to_list()[:3]
+
+    # range and decimation
+    assert len(dm.history(start=df.index[1], stop=df.index[3])) == 3
+    assert len(dm.history(max_rows=4)) == 4
+
+
+def test_update():
+    df = pandas.DataFrame(
+        data={"random1": [random.randint(-10, 10) for _ in range(3)]}, index=[0, 1, 2],
+    )
+    dm = DataModel(name="TestDataModel", data=df)
+
+    dm.update(pandas.DataFrame(data={"random1": [42, 43]}, index=[1, 3]))
+
+    assert dm.data["random1"].to_list() == [df["random1"][0], 42, df["random1"][2], 43]
+    assert dm.delta.patch.index.to_list() == [1]
+    assert dm.delta.stream.index.to_list() == [3]
+
+
+def test_ingest():
+    dm = DataModel(
+        name="TestDataModel", data=pandas.DataFrame(data={"random1": [0]}, index=[0])
+    )
+    updates = []
+    dm.on_update(lambda m: updates.append(len(m.delta.stream)))
+
+    async def rows():
+        for i in range(1, 6):
+            yield pandas.DataFrame(data={"random1": [i]}, index=[i])
+
+    async def ingesting():
+        # batched by size
+        await dm.ingest(rows(), max_rows=2, max_delay=10)
+        assert dm.data["random1"].to_list() == [0, 1, 2, 3, 4, 5]
+        assert updates == [2, 2, 1]
+
+        # from a queue, batched by time
+        queue = asyncio.Queue()
+        task = asyncio.create_task(dm.ingest(queue, max_delay=0.01))
+        queue.put_nowait(pandas.DataFrame(data={"random1": [6]}, index=[6]))
+        queue.put_nowait(pandas.DataFrame(data={"random1": [-1]}, index=[1]))
+        await asyncio.sleep(0.1)
+        assert updates == [2, 2, 1, 1]
+        assert dm.data["random1"].to_list() == [0, -1, 2, 3, 4, 5, 6]
+        queue.put_nowait(None)
+        await asyncio.wait_for(task, 1)
+
+        # stops when the last document is gone
+        ds = MagicMock()
+        dm._rendered_datasources.append(ds)
+        task = asyncio.create_task(dm.ingest(asyncio.Queue(), max_delay=0.01))
+        await asyncio.sleep(0.05)
+        assert not task.done()
+        ds.document = None
+        await asyncio.wait_for(task, 1)
+
+        # the producer is stopped and closed with the ingestion, even when blocked on a full queue
+        closed = []
+
+        async def endless():
+            try:
+                i = 100
+                while True:
+                    i += 1
+                    yield pandas.DataFrame(data={"random1": [i]}, index=[i])
+            finally:
+                closed.append(True)
+
+        ds.document = MagicMock()
+        task = asyncio.create_task(dm.ingest(endless(), max_rows=2, max_delay=0.01))
+        await asyncio.sleep(0.05)
+        ds.document = None
+        await asyncio.wait_for(task, 1)
+        assert closed == [True]
+        assert asyncio.all_tasks() == {asyncio.current_task()}
+
+        # a failing producer ends the ingestion with its exception, after its rows
+        async def failing():
+            yield pandas.DataFrame(data={"random1": [200]}, index=[200])
+            raise ValueError("producer failed")
+
+        with pytest.raises(ValueError, match="producer failed"):
+            await asyncio.wait_for(
+                dm.ingest(failing(), max_delay=0.01, until_detached=False), 2
+            )
+        assert dm.data["random1"].iloc[-1] == 200
+        assert asyncio.all_tasks() == {asyncio.current_task()}
+
+    asyncio.run(ingesting())
+
+
+def test_feed():
+    dm = DataModel(
+        name="TestDataModel", data=pandas.DataFrame(data={"random1": [0]}, index=[0])
+    )
+
+    def produce(feed, start):
+        for i in range(start, start + 100):
+            feed.put(pandas.DataFrame(data={"random1": [i]}, index=[i]))
+
+    async def feeding():
+        feed = dm.feed(maxsize=10)  # producers have to wait for the loop
+        threads = [
+            threading.Thread(target=produce, args=(feed, start)) for start in (1, 101)
+        ]
+        for t in threads:
+            t.start()
+        while any(t.is_alive() for t in threads):
+            await asyncio.sleep(0.01)
+        await asyncio.sleep(0.01)  # last drain
+
+    asyncio.run(feeding())
+    assert sorted(dm.data["random1"].to_list()) == list(range(201))
+    # batches were merged
+    assert dm.metrics.updates < 200
+
+
+def test_headless_import():
+    # the data layer does not need the rendering stack
+    code = "import sys, livebokeh.datamodel; assert 'bokeh' not in sys.modules"
+    subprocess.run([sys.executable, "-c", code], check=True)
+
+
 if __name__ == "__main__":
     pytest.main(["-s", __file__])
@@ -8,6 +8,7 @@ from bokeh.models import Plot
 
 from livebokeh.datamodel import DataModel
 from livebokeh.dataview import DataView
+from livebokeh.storage import ColumnFiles
 
 
 def test_render():
@@ -37,3 +38,26 @@ def test_render():
 
     assert isinstance(rendered, Plot)
     assert rendered2 != rendered
+
+
+def test_render_history(tmp_path):
+    df = pandas.DataFrame(
+        data={"random1": [random.randint(-10, 10) for _ in range(100)]},
+        index=pandas.date_range("2020-01-01", periods=100, freq="s"),
+    )
+
+    dm = DataModel(
+        name="TestDataModel", data=df, spill=ColumnFiles(tmp_path), hot_rows=10
+    )
+    dv = DataView(model=dm)
+    rendered = dv.plot
+
+    live, history = [r.data_source for r in rendered.renderers]
+    assert len(live.data["index"]) == 10
+    assert len(history.data["index"]) == 0
+
+    # zooming out, in milliseconds for a datetime axis
+    rendered.x_range.start = df.index[0].value / 1e6
+    rendered.x_range.end = df.index[-1].value / 1e6
+
+    assert 90 <= len(history.data["index"]) <= dv.history_rows
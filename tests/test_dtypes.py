@@ -0,0 +1,99 @@
+import numpy
+import pandas
+
+from bokeh.document import Document
+
+from livebokeh.datamodel import DataModel
+from livebokeh.dtypes import DtypePolicy
+from tests.test_datamodel import _ordered_document
+
+
+def test_policy():
+    df = pandas.DataFrame(
+        data={
+            "f": [0.5, 1.5, 2.5, 3.5],
+            "i": [1, 2, 3, 4],
+            "s": ["a", "b", "a", "a"],
+            "u": ["w", "x", "y", "z"],  # too many unique values
+            "t": pandas.date_range("2020-01-01", periods=4, freq="s"),
+        },
+        index=pandas.date_range("2020-01-01", periods=4, freq="s"),
+    )
+    policy = DtypePolicy()
+
+    compact = policy(df)
+    assert compact["f"].dtype == numpy.float32
+    assert compact["i"].dtype == numpy.int32
+    assert compact["s"].dtype == "category"
+    assert compact["u"].dtype == object
+    assert compact["t"].dtype == numpy.float64
+    assert compact["t"].to_list() == compact.index.to_list()
+    assert compact.index[0] == pandas.Timestamp("2020-01-01").value / 1e6
+    assert compact.memory_usage(deep=True).sum() < df.memory_usage(deep=True).sum()
+
+    # later rows, new categories are appended
+    more = policy(pandas.DataFrame(data={"s": ["c", "a"]}), like=compact)
+    assert list(more["s"].cat.categories) == ["a", "b", "c"]
+    assert list(DtypePolicy.extend(compact, more)["s"].cat.categories) == [
+        "a",
+        "b",
+        "c",
+    ]
+
+    # integers not fitting in int32 get the smallest wider dtype
+    assert policy(pandas.DataFrame(data={"i": [2 ** 40]}))["i"].dtype == numpy.int64
+    wider = policy(pandas.DataFrame(data={"i": [3_000_000_000]}), like=compact)
+    assert wider["i"].dtype == numpy.int64
+    assert DtypePolicy.widened(compact, wider) == {"i": numpy.int64}
+    assert DtypePolicy.extend(compact, wider)["i"].dtype == numpy.int64
+
+
+def test_datamodel_dtypes():
+    df = pandas.DataFrame(
+        data={"i": [1, 2, 3, 4], "s": ["a", "b", "a", "a"]},
+        index=pandas.date_range("2020-01-01", periods=4, freq="s"),
+    )
+    dm = DataModel(name="TestDataModel", data=df, dtypes=DtypePolicy())
+    assert dm.data["i"].dtype == numpy.int32
+
+    source = dm.source
+    Document().add_root(source)
+
+    dm.update(
+        pandas.DataFrame(
+            data={"i": [5, 6], "s": ["b", "c"]},
+            index=pandas.date_range("2020-01-01 00:00:04", periods=2, freq="s"),
+        )
+    )
+    assert dm.data["i"].dtype == numpy.int32
+    assert dm.data["s"].dtype == "category"
+    assert dm.data["s"].to_list() == ["a", "b", "a", "a", "b", "c"]
+
+    # bokeh can stream categoricals, as datasource data
+    source.stream(DataModel._source_data(dm.delta.stream))
+    assert list(source.data["s"]) == ["a", "b", "a", "a", "b", "c"]
+    assert list(source.data["index"]) == dm.data.index.to_list()
+
+
+def test_datamodel_wider_integers():
+    df = pandas.DataFrame(data={"vol": [1, 2]})
+    dm = DataModel(name="TestDataModel", data=df, dtypes=DtypePolicy())
+    assert dm.data["vol"].dtype == numpy.int32
+
+    source = dm.source
+    flush = _ordered_document(source)
+
+    dm.update(pandas.DataFrame(data={"vol": [3_000_000_000]}, index=[2]))
+    assert dm.data["vol"].dtype == numpy.int64
+    assert dm.data["vol"].to_list() == [1, 2, 3_000_000_000]
+    # int32 arrays in the browser cannot hold it : datasources data is replaced, not streamed.
+    assert dm.delta.rolled is None
+    flush()
+    assert source.data["vol"].dtype == numpy.int64
+    assert list(source.data["vol"]) == [1, 2, 3_000_000_000]
+
+    # later rows fit, and are streamed again
+    dm.update(pandas.DataFrame(data={"vol": [4]}, index=[3]))
+    assert dm.delta.rolled == 0
+    flush()
+    assert list(source.data["vol"]) == [1, 2, 3_000_000_000, 4]
@@ -0,0 +1,111 @@
+import math
+import random
+from datetime import datetime, timedelta
+from unittest.mock import MagicMock
+
+import pandas
+import pytest
+from bokeh.document import Document
+
+from livebokeh.datamodel import DataModel
+from livebokeh.metrics import Histogram, metrics, metrics_frame
+
+
+def test_histogram():
+    h = Histogram()
+    assert h.count == 0
+    assert math.isnan(h.mean)
+
+    for v in [0.001, 0.002, 0.003, 0.1]:
+        h.observe(v)
+
+    assert h.count == 4
+    assert h.min == 0.001
+    assert h.max == 0.1
+    assert h.mean == pytest.approx(0.0265)
+    assert 0.003 <= h.quantile(0.5) <= 0.004
+    assert h.quantile(1) == 0.1
+
+
+def test_model_metrics():
+    now = datetime.now()
+
+    # TODO : generate sample data with hypothesis
+    df = pandas.DataFrame(
+        data=[
+            [random.randint(-10, 10), random.randint(-10, 10)],
+            [random.randint(-10, 10), random.randint(-10, 10)],
+        ],
+        columns=["random1", "random2"],
+        index=[now, now + timedelta(milliseconds=1)],
+    )
+
+    dm = DataModel(name="TestDataModel", data=df)
+    doc = Document()
+    doc.add_root(dm.view.table)
+
+    dm(
+        df.append(
+            pandas.DataFrame(
+                data=[[11, 11]],
+                columns=["random1", "random2"],
+                index=[now + timedelta(milliseconds=2)],
+            )
+        )
+    )
+
+    assert dm.metrics.updates == 1
+    assert dm.metrics.rows_streamed == 1
+    assert dm.metrics.rows_patched == 0
+    assert dm.metrics.patch_time.count == 1
+    assert dm.metrics.stream_time.count == 1
+    assert list(dm.metrics.bytes_queued) == [id(doc)]
+    queued = dm.metrics.bytes_queued[id(doc)]
+    assert queued > 0
+    # stream only, not run yet
+    assert dm.metrics.pending_callbacks == 1
+
+    m = metrics()[id(dm)]
+    assert m["name"] == "TestDataModel"
+    assert m["datasources"] == 1
+    assert m["rows_streamed"] == 1
+    assert m["bytes_queued"] == m["bytes_queued_max"] == queued
+    assert m["bytes_queued_per_document"] == {id(doc): queued}
+
+    frame = metrics_frame()
+    assert id(dm) in frame.index
+    assert "bytes_queued_per_document" not in frame.columns
+
+    # forgotten with the document datasources
+    dm.detach(dm._rendered_datasources)
+    assert dm.metrics.bytes_queued == {}
+
+
+def test_trace_latency():
+    df = pandas.DataFrame(data={"random1": [1, 2]})
+    dm = DataModel(name="TestDataModel", data=df, debug=False, trace="browser")
+    source = dm.source
+    callbacks = []
+    source._document = MagicMock(add_next_tick_callback=callbacks.append)
+
+    dm.update(pandas.DataFrame(data={"random1": [3]}, index=[2]))
+    assert dm.delta.sequence == 1
+    assert dm.metrics.diff_latency.count == 1
+    while callbacks:  # in order, like a session
+        callbacks.pop(0)()
+    assert dm.metrics.callback_latency.count == 1
+    assert dm.metrics.written_latency.count == 1
+    assert dm.metrics.written_latency.min >= dm.metrics.callback_latency.max
+
+    # the sequence is sent after the update, and the browser sends it back
+    assert source.tags == [1]
+    ack = source.js_property_callbacks["change:tags"][0].args["ack"]
+    ack.tags = [1]
+    assert dm.metrics.browser_latency.count == 1
+
+    with pytest.raises(TypeError):
+        DataModel(name="TestDataModel", data=df, trace="everything")
+
+
+if __name__ == "__main__":
+    pytest.main(["-s", __file__])
@@ -0,0 +1,136 @@
+import asyncio
+import random
+from datetime import datetime, timedelta
+
+import pandas
+import pytest
+from bokeh.document import Document
+
+from livebokeh.datamodel import DataModel
+from livebokeh.monosrv import LazyModule, _SessionLifecycle, monosrv
+from livebokeh.profiler import SamplingProfiler
+
+
+def test_session_destroyed_detaches_sources():
+    now = datetime.now()
+
+    # TODO : generate sample data with hypothesis
+    df = pandas.DataFrame(
+        data=[
+            [random.randint(-10, 10), random.randint(-10, 10)],
+            [random.randint(-10, 10), random.randint(-10, 10)],
+        ],
+        columns=["random1", "random2"],
+        index=[now, now + timedelta(milliseconds=1)],
+    )
+
+    dm = DataModel(name="TestDataModel", data=df)
+
+    destroyed = list()
+
+    def app(doc):
+        doc.add_root(dm.view.table)
+
+    doc = Document()
+    app(doc)
+    _SessionLifecycle(on_session_destroyed=[destroyed.append]).modify_document(doc)
+
+    assert len(dm._rendered_datasources) == 1
+
+    # simulating bokeh's DocumentLifecycleHandler
+    for cb in doc.session_destroyed_callbacks:
+        cb("session_context")
+
+    assert dm._rendered_datasources == []
+    assert destroyed == ["session_context"]
+
+
+def test_lazy_module():
+    lazy = LazyModule("livebokeh.dataview", stop_when_unused=True)
+    assert not lazy.started
+
+    async def sessions():
+        await lazy.on_session_created("session_context")
+        assert lazy.started
+        assert len(lazy.models) == 1
+        tasks = set(lazy._tasks)
+        assert tasks  # the example producer
+
+        doc = Document()
+        lazy.modify_document(doc)
+        assert doc.roots
+
+        # a second session does not start the example again
+        await lazy.on_session_created("session_context")
+        assert lazy._tasks == tasks
+
+        await lazy.on_session_destroyed("session_context")
+        assert lazy.started
+        await lazy.on_session_destroyed("session_context")
+        assert not lazy.started
+        await asyncio.sleep(0)
+        assert all(t.cancelled() for t in tasks)
+
+    asyncio.run(sessions())
+
+
+def test_lazy_module_snapshots(tmp_path):
+    from livebokeh.snapshot import Snapshots
+
+    snapshots = Snapshots(tmp_path)
+    lazy = LazyModule(
+        "livebokeh.dataview",
+        stop_when_unused=True,
+        on_started=lambda lazy: [snapshots.register(m) for m in lazy.models],
+        on_stopped=lambda lazy: [snapshots.unregister(m) for m in lazy.models],
+    )
+
+    async def restarting():
+        await lazy.on_session_created("session_context")
+        first = lazy.models[0]
+        await asyncio.sleep(0)
+        await lazy.on_session_destroyed("session_context")
+        assert first not in snapshots._models.values()
+
+        # new models with the same names, restored from the last snapshot
+        await lazy.on_session_created("session_context")
+        (second,) = lazy.models
+        assert second is not first
+        assert second._name == first._name
+        assert snapshots._models[second._name] is second
+        assert set(first.data.index) <= set(second.data.index)
+        await lazy.on_session_destroyed("session_context")
+
+    asyncio.run(restarting())
+    snapshots.close()
+
+
+def test_profile_route():
+    from tornado.httpclient import AsyncHTTPClient
+
+    async def serving():
+        profiler = SamplingProfiler(interval=0.001)
+        server = asyncio.create_task(
+            monosrv({"/": lambda doc: None}, duration=5, profiler=profiler, port=5017)
+        )
+        await asyncio.sleep(0.2)
+        client = AsyncHTTPClient()
+
+        # toggled at runtime
+        response = await client.fetch("http://localhost:5017/profile?run=1")
+        assert profiler.running
+        await asyncio.sleep(0.1)
+        response = await client.fetch("http://localhost:5017/profile?folded")
+        # the event loop thread is sampled
+        assert b"_run_once (base_events.py" in response.body
+
+        response = await client.fetch("http://localhost:5017/profile?run=0&reset")
+        assert not profiler.running
+        assert response.body.startswith(b"stopped, 0 samples")
+        server.cancel()
+
+    asyncio.run(serving())
+
+
+if __name__ == "__main__":
+    pytest.main(["-s", __file__])
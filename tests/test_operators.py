@@ -0,0 +1,239 @@
+import numpy
+import pandas
+import pytest
+
+from livebokeh.datamodel import DataModel
+
+
+def test_outer_join():
+    left = DataModel(
+        name="left",
+        data=pandas.DataFrame(data={"a": [1, 2]}, index=[0, 1]),
+        debug=False,
+    )
+    right = DataModel(
+        name="right",
+        data=pandas.DataFrame(data={"b": [10, 20]}, index=[1, 2]),
+        debug=False,
+    )
+    joined = left.join(right)
+    pandas.testing.assert_frame_equal(
+        joined.data, left.data.join(right.data, how="outer")
+    )
+    assert left.join(right) is joined
+
+    left.update(pandas.DataFrame(data={"a": [3, -1]}, index=[2, 0]))
+    right.update(pandas.DataFrame(data={"b": [30]}, index=[3]))
+    # only touched rows were joined again
+    assert right.delta.stream.index.to_list() == [3]
+    assert joined.delta.stream.index.to_list() == [3]
+    assert joined.delta.patch.empty
+
+    expected = left.data.join(right.data, how="outer")
+    pandas.testing.assert_frame_equal(
+        joined.data.sort_index(), expected, check_dtype=False
+    )
+
+    with pytest.raises(TypeError):
+        left.join(left)
+
+
+def test_asof_join():
+    left = DataModel(
+        name="left",
+        data=pandas.DataFrame(data={"a": [1, 2, 3, 4]}, index=[0, 10, 20, 30]),
+        debug=False,
+    )
+    right = DataModel(
+        name="right",
+        data=pandas.DataFrame(data={"b": [5, 15]}, index=[5, 15]),
+        debug=False,
+    )
+
+    def expected():
+        return pandas.merge_asof(
+            left.data, right.data, left_index=True, right_index=True
+        )
+
+    joined = left.join(right, how="asof")
+    pandas.testing.assert_frame_equal(joined.data, expected(), check_dtype=False)
+
+    # a new right row changes the match of the left rows after it only
+    right.update(pandas.DataFrame(data={"b": [25]}, index=[25]))
+    assert joined.delta.patch.index.to_list() == [30]
+    pandas.testing.assert_frame_equal(joined.data, expected(), check_dtype=False)
+
+    # patching a right row
+    right.update(pandas.DataFrame(data={"b": [-15]}, index=[15]))
+    assert joined.delta.patch.index.to_list() == [20]
+
+    left.update(pandas.DataFrame(data={"a": [5]}, index=[40]))
+    pandas.testing.assert_frame_equal(joined.data, expected(), check_dtype=False)
+
+
+@pytest.mark.parametrize("agg", ["count", "sum", "mean", "std", "min", "max"])
+@pytest.mark.parametrize("window", [3, "3s"])
+def test_rolling(agg, window):
+    index = pandas.date_range("2020-01-01", periods=10, freq="s")
+    df = pandas.DataFrame(data={"a": range(10), "b": [1.0, None] * 5}, index=index)
+    dm = DataModel(name="TestDataModel", data=df, debug=False)
+    rolled = dm.rolling(window, agg=agg)
+
+    def expected():
+        rolling = dm.data.rolling(window, min_periods=0 if agg == "count" else None)
+        return getattr(rolling, agg)()
+
+    pandas.testing.assert_frame_equal(rolled.data, expected(), check_freq=False)
+
+    # streaming, with rollover of the first rows
+    more = pandas.DataFrame(
+        data={"a": [10, 11], "b": [2.0, 3.0]},
+        index=pandas.date_range("2020-01-01 00:00:10", periods=2, freq="s"),
+    )
+    dm(pandas.concat([dm.data, more]).iloc[2:])
+    # only the new windows
+    assert rolled.delta.stream.index.to_list() == more.index.to_list()
+    assert rolled.data.index.equals(dm.data.index)
+    # Note : pandas does not know the dropped rows anymore, for the first windows.
+    pandas.testing.assert_frame_equal(
+        rolled.data.iloc[2:], expected().iloc[2:], check_freq=False
+    )
+    # the same model again, the last update is not applied twice
+    assert dm.rolling(window, agg=agg) is rolled
+    assert rolled.data.index.equals(dm.data.index)
+
+    # patching a row changes the windows including it
+    dm.update(pandas.DataFrame(data={"a": [-5]}, index=[index[5]]))
+    pandas.testing.assert_frame_equal(
+        rolled.data.iloc[2:], expected().iloc[2:], check_freq=False
+    )
+
+
+@pytest.mark.parametrize("agg", ["count", "sum", "mean", "std", "min", "max"])
+def test_resample(agg):
+    index = pandas.date_range("2020-01-01", periods=10, freq="20s")
+    df = pandas.DataFrame(data={"a": range(10)}, index=index)
+    dm = DataModel(name="TestDataModel", data=df, debug=False)
+    resampled = dm.resample("1min", agg=agg)
+
+    def expected():
+        return getattr(dm.data.resample("1min"), agg)().astype(float)
+
+    pandas.testing.assert_frame_equal(resampled.data, expected(), check_freq=False)
+
+    # streamed rows, in the last bucket and a new one
+    dm.update(
+        pandas.DataFrame(
+            data={"a": [10, 11]},
+            index=pandas.date_range("2020-01-01 00:03:20", periods=2, freq="20s"),
+        )
+    )
+    pandas.testing.assert_frame_equal(resampled.data, expected(), check_freq=False)
+
+    # patched row
+    dm.update(pandas.DataFrame(data={"a": [-5]}, index=[index[4]]))
+    if agg not in ("count", "max"):  # unchanged
+        assert resampled.delta.patch.index.to_list() == [index[3]]
+    pandas.testing.assert_frame_equal(resampled.data, expected(), check_freq=False)
+
+    # a patched row and a streamed one, in the same bucket
+    dm.update(
+        pandas.DataFrame(
+            data={"a": [100, 12]},
+            index=[index[9], pandas.Timestamp("2020-01-01 00:03:59")],
+        )
+    )
+    pandas.testing.assert_frame_equal(resampled.data, expected(), check_freq=False)
+
+    # the same model again, the last update is not applied twice
+    assert dm.resample("1min", agg=agg) is resampled
+    pandas.testing.assert_frame_equal(resampled.data, expected(), check_freq=False)
+
+
+@pytest.mark.parametrize("agg", ["count", "sum", "mean", "last", "min", "max"])
+@pytest.mark.parametrize("by", ["symbol", ["symbol", "side"]])
+def test_groupby(agg, by):
+    df = pandas.DataFrame(
+        data={
+            "symbol": ["A", "B", "A", "C", "B", "A"],
+            "side": ["buy", "sell"] * 3,
+            "price": [1.0, 2.0, 3.0, None, 5.0, 6.0],
+        }
+    )
+    dm = DataModel(name="TestDataModel", data=df, debug=False)
+    grouped = dm.groupby(by, agg=agg)
+
+    def expected():
+        return getattr(dm.data.groupby(by, sort=False)[list(grouped.columns)], agg)()
+
+    pandas.testing.assert_frame_equal(grouped.data, expected(), check_dtype=False)
+
+    # streamed rows : known groups are patched, new ones streamed
+    dm.update(
+        pandas.DataFrame(
+            data={
+                "symbol": ["A", "A", "D"],
+                "side": ["buy", "buy", "sell"],
+                "price": [0.5, 10.0, 8.0],
+            },
+            index=[6, 7, 8],
+        )
+    )
+    assert len(grouped.delta.stream) == 1
+    assert grouped.delta.patch.index.to_list() == expected().index[:1].to_list()
+    pandas.testing.assert_frame_equal(grouped.data, expected(), check_dtype=False)
+
+    # the same model again, the last update is not applied twice
+    assert dm.groupby(by, agg=agg) is grouped
+    pandas.testing.assert_frame_equal(grouped.data, expected(), check_dtype=False)
+
+    # a patched row moving to another group changes both. Note : new groups are last.
+    dm.update(pandas.DataFrame(data={"symbol": ["B"]}, index=[2]))
+    pandas.testing.assert_frame_equal(
+        grouped.data.sort_index(), expected().sort_index(), check_dtype=False
+    )
+
+    # rollover : dropped rows leave their group
+    dm(dm.data.iloc[3:])
+    pandas.testing.assert_frame_equal(
+        grouped.data.loc[expected().index], expected(), check_dtype=False
+    )
+
+
+def test_eval():
+    df = pandas.DataFrame(
+        data={"a": [1.0, 2.0, 3.0], "b": [4.0, 5.0, 6.0], "d": [1.0, 2.0, 3.0]}
+    )
+    dm = DataModel(name="TestDataModel", data=df, debug=False)
+    computed = dm.eval("c = a * b + log(d)")
+
+    def expected():
+        return dm.data.assign(c=dm.data.a * dm.data.b + numpy.log(dm.data.d))
+
+    pandas.testing.assert_frame_equal(computed.data, expected())
+
+    # only delta rows are evaluated, and applied as a delta
+    dm.update(
+        pandas.DataFrame(
+            data={"a": [10.0, 4.0], "b": [1.0, 7.0], "d": [1.0, 4.0]}, index=[1, 3]
+        )
+    )
+    assert computed.delta.patch.index.to_list() == [1]
+    assert computed.delta.stream.index.to_list() == [3]
+    pandas.testing.assert_frame_equal(computed.data, expected())
+
+    # a patch on some columns only
+    dm.update(pandas.DataFrame(data={"d": [5.0]}, index=[0]))
+    pandas.testing.assert_frame_equal(computed.data, expected())
+
+    # rollover
+    more = pandas.DataFrame(data={"a": [1.0], "b": [1.0], "d": [1.0]}, index=[4])
+    dm(pandas.concat([dm.data, more]).iloc[2:])
+    pandas.testing.assert_frame_equal(computed.data, expected())
+
+    # the same model again, the rolled rows are not dropped twice
+    assert dm.eval("c = a * b + log(d)") is computed
+    pandas.testing.assert_frame_equal(computed.data, expected())
+
+    with pytest.raises(TypeError):
+        dm.eval("a * b")
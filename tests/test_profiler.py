@@ -0,0 +1,37 @@
+import time
+
+from livebokeh.profiler import SamplingProfiler
+
+
+def busy(duration):
+    end = time.perf_counter() + duration
+    while time.perf_counter() < end:
+        pass
+
+
+def test_sampling():
+    profiler = SamplingProfiler(interval=0.001)
+    assert not profiler.running
+    profiler.start()
+    assert profiler.running
+    busy(0.2)
+    profiler.stop()
+    assert not profiler.running
+
+    samples = profiler.samples
+    assert samples > 10
+    # nothing sampled while stopped
+    busy(0.05)
+    assert profiler.samples == samples
+
+    folded = profiler.folded().splitlines()
+    assert any(
+        "test_sampling (test_profiler.py" in line and ";busy (" in line
+        for line in folded
+    )
+    # root first, sample count last
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in folded)
+    assert "busy (test_profiler.py" in profiler.summary()
+
+    profiler.reset()
+    assert profiler.samples == 0
@@ -0,0 +1,69 @@
+import asyncio
+
+import pandas
+import pytest
+
+from livebokeh.datamodel import DataModel
+from livebokeh.replay import Replay, load
+
+
+def test_replay_rows():
+    frame = pandas.DataFrame(data={"value": range(5)})
+    dm = DataModel(name="TestDataModel", data=frame.iloc[:0], debug=False)
+    streamed = []
+    dm.on_update(lambda m: streamed.append(len(m.delta.stream)))
+
+    asyncio.run(dm.ingest(Replay(frame, rate=1000, rows=2), max_rows=1))
+    pandas.testing.assert_frame_equal(dm.data, frame, check_index_type=False)
+    # pure appends, one step each
+    assert streamed == [2, 2, 1]
+
+
+def test_replay_loop():
+    frame = pandas.DataFrame(data={"value": [1, 2, 3]}, index=[10, 12, 14])
+
+    async def replaying():
+        steps = []
+        async for step in Replay(frame, rate=1000, rows=2, loop=True):
+            steps.append(step)
+            if len(steps) == 4:
+                return steps
+
+    steps = asyncio.run(replaying())
+    # the index keeps increasing, with the same spacing
+    assert pandas.concat(steps).index.to_list() == [10, 12, 14, 16, 18, 20]
+    assert pandas.concat(steps)["value"].to_list() == [1, 2, 3, 1, 2, 3]
+
+
+def test_replay_speed():
+    frame = pandas.DataFrame(
+        data={"value": range(4)},
+        index=pandas.date_range("2020-01-01", periods=4, freq="10s"),
+    )
+
+    async def replaying():
+        steps = []
+        async for step in Replay(frame, rate=20, speed=200):  # 10s each 0.05s
+            steps.append(step)
+        return steps
+
+    steps = asyncio.run(replaying())
+    assert pandas.concat(steps).index.equals(frame.index)
+    # about one row per step
+    assert len(steps) >= 3
+
+    with pytest.raises(TypeError):
+        Replay(frame.reset_index(drop=True), speed=2)
+
+
+def test_load(tmp_path):
+    frame = pandas.DataFrame(
+        data={"value": [1.0, 2.0]},
+        index=pandas.date_range("2020-01-01", periods=2, freq="s"),
+    )
+    frame.to_pickle(tmp_path / "frame.pkl")
+    pandas.testing.assert_frame_equal(load(tmp_path / "frame.pkl"), frame)
+    frame.to_csv(tmp_path / "frame.csv")
+    pandas.testing.assert_frame_equal(
+        load(tmp_path / "frame.csv"), frame, check_freq=False
+    )
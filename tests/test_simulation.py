@@ -0,0 +1,54 @@
+import asyncio
+
+import numpy
+import pandas
+
+from livebokeh.datamodel import DataModel
+from livebokeh.simulation import Paths, markov_chain, random_walk, uniform_integers
+
+
+def test_paths_seed():
+    first = Paths(random_walk(), paths=50, seed=42, clock=False).advance(10)
+    second = Paths(random_walk(), paths=50, seed=42, clock=False).advance(10)
+    assert first.shape == (10, 50)
+    assert first.index.to_list() == list(range(10))
+    pandas.testing.assert_frame_equal(first, second)
+    # independent paths
+    assert not first["path0"].equals(first["path1"])
+
+
+def test_random_walk():
+    paths = Paths(random_walk(scale=2.0, drift=1.0), paths=1000, seed=1)
+    rows = paths.advance(2)
+    assert rows.index.is_monotonic_increasing
+    increments = rows.iloc[1] - rows.iloc[0]
+    assert abs(increments.mean() - 1.0) < 0.2
+    assert abs(increments.std() - 2.0) < 0.2
+
+
+def test_markov_chain():
+    # alternating between two states
+    paths = Paths(markov_chain([[0, 1], [1, 0]]), paths=5, seed=1, clock=False)
+    rows = paths.advance(4)
+    assert rows["path0"].to_list() == [1, 0, 1, 0]
+
+    paths = Paths(markov_chain([[0.5, 0.5], [0.1, 0.9]]), paths=100, seed=1)
+    assert set(numpy.unique(paths.advance(10).to_numpy())) <= {0, 1}
+
+
+def test_paths_ingest():
+    paths = Paths(uniform_integers(-10, 10), columns=["a", "b"], seed=1, period=0.01)
+    dm = DataModel(name="TestDataModel", data=paths.advance(), debug=False)
+    streamed = []
+    dm.on_update(lambda m: streamed.append(len(m.delta.stream)))
+
+    async def ingesting():
+        task = asyncio.create_task(dm.ingest(paths, max_delay=0.001))
+        await asyncio.sleep(0.1)
+        task.cancel()
+
+    asyncio.run(ingesting())
+    assert dm.data.columns.to_list() == ["a", "b"]
+    assert dm.data.abs().max().max() <= 10
+    # one delta per tick, streamed
+    assert len(streamed) > 2 and set(streamed) == {1}
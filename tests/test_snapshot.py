@@ -0,0 +1,107 @@
+import random
+
+import pandas
+import pytest
+
+from livebokeh.datamodel import DataModel
+from livebokeh.snapshot import Snapshots
+from livebokeh.storage import ColumnFiles
+
+
+def frame(start, periods):
+    return pandas.DataFrame(
+        data={"random1": [random.randint(-10, 10) for _ in range(periods)]},
+        index=pandas.date_range(start, periods=periods, freq="s"),
+    )
+
+
+def test_restore(tmp_path):
+    df = frame("2020-01-01", 3)
+
+    snapshots = Snapshots(tmp_path)
+    dm = snapshots.register(DataModel(name="TestDataModel", data=df))
+
+    snapshots.snapshot()
+
+    # after the snapshot, one stream and one patch in the log
+    more = pandas.concat([df, frame("2020-01-01 00:00:03", 1)])
+    dm(more)
+    patched = more.copy()
+    patched.iloc[0] = 42
+    dm(patched)
+    snapshots.close()
+    # not saved anymore, but still updated
+    dm(pandas.concat([patched, frame("2020-01-01 00:00:04", 1)]))
+
+    # restarting
+    restarted = Snapshots(tmp_path).register(
+        DataModel(name="TestDataModel", data=df.iloc[:1])
+    )
+    pandas.testing.assert_frame_equal(restarted.data, patched, check_freq=False)
+
+
+def test_restore_spilled(tmp_path):
+    df = frame("2020-01-01", 5)
+
+    snapshots = Snapshots(tmp_path / "snapshots")
+    dm = snapshots.register(
+        DataModel(
+            name="TestDataModel",
+            data=df,
+            spill=ColumnFiles(tmp_path / "spill"),
+            hot_rows=2,
+        )
+    )
+    snapshots.snapshot()
+    saved = tmp_path / "snapshots" / "TestDataModel"
+    cold = ColumnFiles(saved / "cold")
+    assert len(cold) == 3
+    assert len(ColumnFiles(saved / "snapshot")) == 2  # the hot rows only
+
+    # the next snapshot only appends the rows spilled since
+    more = frame("2020-01-01 00:00:05", 2)
+    dm.update(more)
+    snapshots.snapshot()
+    assert len(cold) == 5
+    assert len(ColumnFiles(saved / "snapshot")) == 2
+    snapshots.close()
+
+    # restarting, without the spill files : cold rows are spilled again
+    restarted = Snapshots(tmp_path / "snapshots").register(
+        DataModel(
+            name="TestDataModel",
+            data=df.iloc[:1],
+            spill=ColumnFiles(tmp_path / "respill"),
+            hot_rows=2,
+        )
+    )
+    assert len(restarted._spill) == 5
+    pandas.testing.assert_frame_equal(
+        restarted.history(), pandas.concat([df, more]), check_freq=False
+    )
+
+    # or restored in memory, without a spill
+    pandas.testing.assert_frame_equal(
+        Snapshots(tmp_path / "snapshots").restore("TestDataModel"),
+        pandas.concat([df, more]),
+        check_freq=False,
+    )
+
+
+def test_not_snapshottable(tmp_path):
+    dm = DataModel(name="TestDataModel", data=pandas.DataFrame(data={"name": ["a"]}))
+
+    with pytest.raises(TypeError):
+        Snapshots(tmp_path).register(dm)
+
+    # categoricals, as from a DtypePolicy
+    dm = DataModel(
+        name="TestDataModel",
+        data=pandas.DataFrame(data={"name": pandas.Categorical(["a"])}),
+    )
+    with pytest.raises(TypeError):
+        Snapshots(tmp_path).register(dm)
+
+
+if __name__ == "__main__":
+    pytest.main(["-s", __file__])
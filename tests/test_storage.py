@@ -0,0 +1,47 @@
+import numpy
+import pandas
+import pytest
+
+from livebokeh.storage import ColumnFiles
+
+
+def test_append_read(tmp_path):
+    df = pandas.DataFrame(
+        data={"random1": numpy.arange(10), "random2": numpy.arange(10) / 2},
+        index=pandas.date_range("2020-01-01", periods=10, freq="s"),
+    )
+
+    cf = ColumnFiles(tmp_path / "history")
+    assert len(cf) == 0
+
+    cf.append(df.iloc[:4])
+    cf.append(df.iloc[4:])
+    assert len(cf) == 10
+    assert cf.columns == ["random1", "random2"]
+
+    pandas.testing.assert_frame_equal(cf.read(), df, check_freq=False)
+    pandas.testing.assert_frame_equal(
+        cf.read(2, 8, 3), df.iloc[2:8:3], check_freq=False
+    )
+
+    assert cf.locate(df.index[5]) == 5
+    assert cf.locate(df.index[5], side="right") == 6
+
+    # reopening finds the same data
+    assert len(ColumnFiles(tmp_path / "history")) == 10
+
+    cf.truncate(3)
+    assert len(cf) == 3
+    cf.append(df.iloc[3:])
+    pandas.testing.assert_frame_equal(cf.read(), df, check_freq=False)
+
+
+def test_object_columns(tmp_path):
+    df = pandas.DataFrame(data={"name": ["a", "b"]})
+
+    with pytest.raises(TypeError):
+        ColumnFiles(tmp_path / "history").append(df)
+
+
+if __name__ == "__main__":
+    pytest.main(["-s", __file__])